@@ -151,6 +151,81 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = config("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD")  # Be cautious with sensitive information
 
+# Response cache for the campaign list. The workers change campaign counters
+# and invalidate the list from their own processes, so the cache must be
+# shared by every process. docker-compose runs Redis for it
+# (django.core.cache.backends.redis.RedisCache via CACHE_BACKEND and
+# CACHE_LOCATION), so a poll costs no query. The default, for setups without
+# Redis, is the database: it needs `manage.py createcachetable`, and each
+# poll still costs one query (two when the body is sent) instead of
+# rebuilding the list. A per-process backend such as LocMemCache would keep
+# serving stale counters.
+CACHES = {
+    "default": {
+        "BACKEND": config("CACHE_BACKEND", default="django.core.cache.backends.db.DatabaseCache"),
+        "LOCATION": config("CACHE_LOCATION", default="mailer_cache"),
+    }
+}
+MAILER_CAMPAIGN_LIST_CACHE_SECONDS = config("MAILER_CAMPAIGN_LIST_CACHE_SECONDS", default=300, cast=int)
+
+# Recipient imports are inserted in batches of this many rows
+MAILER_IMPORT_BATCH_SIZE = config("MAILER_IMPORT_BATCH_SIZE", default=5000, cast=int)
+
+# Uploads are always spooled to a temporary file rather than held in memory
+# (and fingerprinted on the way), then moved under MEDIA_ROOT for
+# import_worker to pick up
+FILE_UPLOAD_HANDLERS = ["mailer.uploads.HashingUploadHandler"]
+MEDIA_ROOT = config("MEDIA_ROOT", default=str(BASE_DIR / "media"))
+
+# Worker processes import_worker uses to parse the files and sheets of a bulk
+# import in parallel (a single file or sheet is parsed in-process)
+MAILER_IMPORT_PROCESSES = config("MAILER_IMPORT_PROCESSES", default=4, cast=int)
+
+# An import_worker leases the job it runs for MAILER_IMPORT_LEASE_SECONDS and
+# renews the lease after every batch; a job whose lease ran out (its worker
+# died) is claimed again by another worker and starts over. A COPY import
+# renews it only once it is done, so it must finish within the lease.
+MAILER_IMPORT_LEASE_SECONDS = config("MAILER_IMPORT_LEASE_SECONDS", default=600, cast=int)
+
+# Rows purge_campaigns deletes per statement when it removes a deleted
+# campaign's recipients, deliveries and reports
+MAILER_PURGE_BATCH_SIZE = config("MAILER_PURGE_BATCH_SIZE", default=5000, cast=int)
+
+# Send engine: recipients rendered and sent per batch, how many messages go
+# over one SMTP connection before it is recycled, and how many connections
+# send in parallel (keep the batch size well above the worker count)
+MAILER_BATCH_SIZE = config("MAILER_BATCH_SIZE", default=100, cast=int)
+MAILER_MAX_MESSAGES_PER_CONNECTION = config("MAILER_MAX_MESSAGES_PER_CONNECTION", default=500, cast=int)
+MAILER_SEND_WORKERS = config("MAILER_SEND_WORKERS", default=4, cast=int)
+
+# Jobs are split into batches of MAILER_LEASE_SIZE recipients that send_worker
+# processes lease; a batch whose lease is not renewed within
+# MAILER_LEASE_SECONDS (its worker died) is picked up by another worker
+MAILER_LEASE_SIZE = config("MAILER_LEASE_SIZE", default=1000, cast=int)
+MAILER_LEASE_SECONDS = config("MAILER_LEASE_SECONDS", default=300, cast=int)
+
+# Provider rate limit in messages/sec for the whole account (0 disables it).
+# send_retry_worker may use MAILER_RETRY_RATE_LIMIT of it (at most half); the
+# rest is divided between the send_worker processes holding a batch, which
+# re-divide it as workers start and stop, so adding workers never goes over
+# the limit. On 421/450/451 replies a process halves its rate down to its
+# share of MAILER_RATE_MIN, throttled messages are retried up to
+# MAILER_THROTTLE_RETRIES times, and the rate recovers after
+# MAILER_RATE_RECOVERY_SECONDS without throttling.
+MAILER_RATE_LIMIT = config("MAILER_RATE_LIMIT", default=20.0, cast=float)
+MAILER_RATE_BURST = config("MAILER_RATE_BURST", default=0, cast=int)
+MAILER_RATE_MIN = config("MAILER_RATE_MIN", default=0.5, cast=float)
+MAILER_RATE_RECOVERY_SECONDS = config("MAILER_RATE_RECOVERY_SECONDS", default=30.0, cast=float)
+MAILER_RETRY_RATE_LIMIT = config("MAILER_RETRY_RATE_LIMIT", default=2.0, cast=float)
+MAILER_THROTTLE_RETRIES = config("MAILER_THROTTLE_RETRIES", default=5, cast=int)
+
+# Transient failures (4xx, dropped connections) go to the send_retry_worker
+# queue with exponential backoff and jitter; after MAILER_RETRY_MAX_ATTEMPTS
+# attempts they become dead letters
+MAILER_RETRY_MAX_ATTEMPTS = config("MAILER_RETRY_MAX_ATTEMPTS", default=5, cast=int)
+MAILER_RETRY_BASE_SECONDS = config("MAILER_RETRY_BASE_SECONDS", default=60.0, cast=float)
+MAILER_RETRY_MAX_SECONDS = config("MAILER_RETRY_MAX_SECONDS", default=3600.0, cast=float)
+
 
 # EMAIL_HOST_PASSWORD=18Wynf@rdautosad
 # EMAIL_HOST_USER='info@autosad.ai'
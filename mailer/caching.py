@@ -0,0 +1,38 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CAMPAIGN_LIST_VERSION_KEY = "mailer:campaign-list:version"
+
+
+def campaign_list_version():
+    """Current version token of the campaign list, used as its cache key and ETag."""
+    version = cache.get(CAMPAIGN_LIST_VERSION_KEY)
+    if version is None:
+        cache.add(CAMPAIGN_LIST_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(CAMPAIGN_LIST_VERSION_KEY)
+    return version
+
+
+def get_campaign_list(version):
+    return cache.get(f"mailer:campaign-list:{version}")
+
+
+def set_campaign_list(version, body):
+    cache.set(
+        f"mailer:campaign-list:{version}", body, settings.MAILER_CAMPAIGN_LIST_CACHE_SECONDS
+    )
+
+
+def invalidate_campaign_list():
+    """Give the campaign list a new version once the current transaction commits.
+
+    Readers take the version before querying, so a list rendered from data
+    that was about to change is stored under the old version and never
+    served again.
+    """
+    transaction.on_commit(
+        lambda: cache.set(CAMPAIGN_LIST_VERSION_KEY, uuid.uuid4().hex, None)
+    )
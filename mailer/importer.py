@@ -0,0 +1,810 @@
+import codecs
+import contextlib
+import csv
+import io
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import openpyxl
+from openpyxl.utils.exceptions import InvalidFileException
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .caching import invalidate_campaign_list
+from .models import Campaign, Email, ImportJob, ImportRowOutcome
+from .sending import chunked
+from .validation import validate_rows
+
+# rows validated per call to validate_rows
+VALIDATION_CHUNK_SIZE = 1000
+
+# row outcomes buffered before they are written to the job's report
+OUTCOME_BATCH_SIZE = 1000
+
+# addresses or ids removed per DELETE statement by delete_recipients
+DELETE_BATCH_SIZE = 1000
+
+# upload formats; zip bundles may hold any of the others
+UPLOAD_EXTENSIONS = (".xls", ".xlsx", ".csv")
+BUNDLE_EXTENSIONS = (".zip",)
+
+
+class ImportResult:
+    """Counts for one import.
+
+    With a ``job``, every row that is not inserted is also written to the
+    job's report (ImportRowOutcome) in buffered batches, so memory does not
+    grow with the number of bad rows. While ``autoflush`` is off (the
+    connection is busy with a COPY) outcomes are only buffered.
+    """
+
+    def __init__(self, job=None):
+        self.job = job
+        self.rows = 0
+        self.inserted = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.outcomes = []
+        self.autoflush = True
+
+    def add_invalid(self, source, row_number, value, error):
+        self.invalid += 1
+        self.record(source, row_number, ImportRowOutcome.OUTCOME_INVALID, value, error)
+
+    def add_duplicate(self, source, row_number, email_address):
+        self.duplicates += 1
+        self.record(source, row_number, ImportRowOutcome.OUTCOME_DUPLICATE, email_address)
+
+    def record(self, source, row_number, outcome, value, error=""):
+        if self.job is None:
+            return
+        self.outcomes.append(
+            ImportRowOutcome(
+                job_id=self.job,
+                source=source[:255],
+                row_number=row_number,
+                outcome=outcome,
+                email_address="" if value is None else str(value)[:254],
+                error=error,
+            )
+        )
+        if self.autoflush and len(self.outcomes) >= OUTCOME_BATCH_SIZE:
+            self.save_outcomes()
+
+    def save_outcomes(self):
+        if self.outcomes:
+            ImportRowOutcome.objects.bulk_create(self.outcomes, batch_size=OUTCOME_BATCH_SIZE)
+            self.outcomes = []
+
+
+def iter_xlsx_rows(file, sheet_name=None, header=False):
+    """Yield (row_number, name, email_address) for a sheet of a workbook.
+
+    Reads the named sheet, or the active one, from the second row on (from
+    the header row with ``header``). The workbook is opened read-only, so
+    rows are parsed as they are iterated instead of the whole sheet being
+    loaded into memory first.
+    """
+    first_row = 1 if header else 2
+    wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        sheet = wb[sheet_name] if sheet_name else wb.active
+        for row_number, row in enumerate(
+            sheet.iter_rows(min_row=first_row, max_col=2, values_only=True), start=first_row
+        ):
+            row = tuple(row) + (None, None)
+            yield row_number, row[0], row[1]
+    finally:
+        # read-only workbooks keep the file handle open until closed
+        wb.close()
+
+
+def detect_encoding(sample):
+    """Guess a CSV upload's encoding from its first bytes.
+
+    BOMs win; otherwise UTF-8 if the sample decodes as UTF-8, else
+    Windows-1252, the encoding Excel on Windows saves CSVs in.
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        sample.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # the sample may end in the middle of a multi-byte character
+        if e.start < len(sample) - 3:
+            return "cp1252"
+    return "utf-8"
+
+
+def iter_csv_rows(file, header=False):
+    """Yield (row_number, name, email_address) from a CSV upload.
+
+    Rows start after the header row, or with it given ``header``. The
+    encoding and dialect (delimiter, quoting) are sniffed from the first
+    64 KB; the rest is decoded and parsed as it is read, never loaded whole.
+    """
+    sample = file.read(64 * 1024)
+    file.seek(0)
+
+    encoding = detect_encoding(sample)
+    sample_text = sample.decode(encoding, errors="ignore")
+    try:
+        # only sniff complete lines
+        dialect = csv.Sniffer().sniff(
+            sample_text[: sample_text.rfind("\n") + 1] or sample_text,
+            delimiters=",;\t|",
+        )
+    except csv.Error:
+        dialect = csv.excel
+
+    text = io.TextIOWrapper(file, encoding=encoding, errors="replace", newline="")
+    try:
+        reader = csv.reader(text, dialect)
+        first_row = 1 if header else 2
+        if not header:
+            next(reader, None)
+        for row_number, row in enumerate(reader, start=first_row):
+            row = row + [None, None]
+            yield row_number, row[0], row[1]
+    finally:
+        # leave the uploaded file itself open for Django to clean up
+        text.detach()
+
+
+def iter_upload_rows(file, name=None, header=False):
+    if (name or file.name).lower().endswith(".csv"):
+        return iter_csv_rows(file, header=header)
+    return iter_xlsx_rows(file, header=header)
+
+
+def iter_valid_rows(rows, result, source=""):
+    """Validate rows chunk by chunk and yield the valid, normalized ones.
+
+    Yields (source, row_number, name, email_address). Counts every row on
+    ``result`` and records the invalid ones there.
+    """
+    for chunk in chunked(rows, VALIDATION_CHUNK_SIZE):
+        result.rows += len(chunk)
+        valid, invalid = validate_rows(chunk)
+        for row_number, value, error in invalid:
+            result.add_invalid(source, row_number, value, error)
+        for row in valid:
+            yield (source,) + row
+
+
+def email_columns():
+    """Quoted column list for raw inserts into the Email table."""
+    opts = Email._meta
+    return ", ".join(
+        connection.ops.quote_name(opts.get_field(name).column)
+        for name in ("email_address", "name", "campaign_id", "added_at")
+    )
+
+
+def add_recipients(campaign_id, count):
+    """Adjust a campaign's recipient_count by ``count`` (negative for deletes)."""
+    if count:
+        Campaign.objects.filter(campaign_id=campaign_id).update(
+            recipient_count=F("recipient_count") + count
+        )
+        invalidate_campaign_list()
+
+
+def insert_emails(campaign, batch):
+    """Insert (name, email_address) rows, skipping any the campaign already has.
+
+    Duplicates are dropped by the (campaign, lower(email_address)) unique
+    index with ON CONFLICT DO NOTHING, which also makes concurrent uploads to
+    one campaign safe. The campaign's recipient_count is bumped by the rows
+    actually inserted, which are returned as lowercased addresses.
+    """
+    if not batch:
+        return set()
+
+    added_at = timezone.now()
+    inserted = set()
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # stay well under the database's limit on bind parameters per statement
+        for chunk in chunked(batch, 10000):
+            cursor.execute(
+                f"INSERT INTO {connection.ops.quote_name(Email._meta.db_table)} ({email_columns()}) "
+                f"VALUES {', '.join(['(%s, %s, %s, %s)'] * len(chunk))} "
+                f"ON CONFLICT DO NOTHING RETURNING lower(email_address)",
+                [
+                    value
+                    for name, email_address in chunk
+                    for value in (email_address, name, campaign.campaign_id, added_at)
+                ],
+            )
+            inserted.update(row[0] for row in cursor.fetchall())
+        add_recipients(campaign.campaign_id, len(inserted))
+
+    return inserted
+
+
+def iter_recipient_list(file, name=None):
+    """Yield the addresses and email ids listed in an uploaded file.
+
+    Files use the import layout (a header row, then name and email columns),
+    or have a single column holding the address or id. The header row tells
+    the two apart, as a spreadsheet does not store an empty email cell: in
+    the import layout only the email column is read, so a numeric name
+    next to a missing address is never taken for an email id.
+    """
+    rows = iter_upload_rows(file, name, header=True)
+    header = next(rows, None)
+    single_column = header is None or header[2] is None or not str(header[2]).strip()
+    for row_number, first, second in rows:
+        value = first if single_column else second
+        if value is not None and str(value).strip():
+            yield value
+
+
+def split_recipient_list(values):
+    """Split listed values into (email addresses, email ids).
+
+    Raises ValueError for a number that is not a whole email id.
+    """
+    email_addresses = []
+    email_ids = []
+    for value in values:
+        # spreadsheet cells may hold ids as numbers, integral or not
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError(f"{value} is not an email address or ID.")
+        if isinstance(value, (int, float)) or str(value).strip().isdigit():
+            email_ids.append(int(value))
+        else:
+            email_addresses.append(str(value))
+    return email_addresses, email_ids
+
+
+def delete_recipients(campaign_id, email_addresses=(), email_ids=(), batch_size=None):
+    """Delete recipients from a campaign by address and by email id.
+
+    Each batch is one set-based DELETE, committed together with its
+    recipient_count update, so a long list neither issues a statement per
+    recipient nor holds its locks until the last batch. Addresses match
+    case-insensitively, through the campaign's lower(email_address) unique
+    index. Returns a {"field", "requested", "deleted"} dict per batch.
+    """
+    if batch_size is None:
+        batch_size = DELETE_BATCH_SIZE
+
+    emails = Email.objects.filter(campaign_id=campaign_id)
+    lookups = (
+        (
+            "email_address",
+            emails.alias(address=Lower("email_address")),
+            "address__in",
+            dict.fromkeys(address.strip().lower() for address in email_addresses),
+        ),
+        ("email_id", emails, "email_id__in", dict.fromkeys(email_ids)),
+    )
+
+    batches = []
+    for field, queryset, lookup, values in lookups:
+        for chunk in chunked(values, batch_size):
+            with transaction.atomic():
+                deleted, _ = queryset.filter(**{lookup: chunk}).delete()
+                add_recipients(campaign_id, -deleted)
+            batches.append({"field": field, "requested": len(chunk), "deleted": deleted})
+    return batches
+
+
+def import_rows(campaign, rows, batch_size=None, progress=None, job=None):
+    """Validate (row_number, name, email_address) rows and insert them into the campaign.
+
+    See insert_rows; with a ``job``, rows that are not inserted go to its
+    report.
+    """
+    result = ImportResult(job)
+    return insert_rows(campaign, iter_valid_rows(rows, result), result, batch_size, progress)
+
+
+def insert_rows(campaign, rows, result, batch_size=None, progress=None):
+    """Insert validated rows into the campaign in fixed-size batches.
+
+    Batches are flushed as they fill up, inside one transaction, so memory
+    is bounded by ``batch_size`` rather than the file or campaign size and
+    a failed import leaves nothing behind. Duplicates (already in the
+    campaign, or repeated in the upload) are found by the database's unique
+    index rather than by loading the campaign's addresses.
+
+    With a ``progress`` callback, every batch commits on its own and the
+    callback gets the running ImportResult after each one, so progress is
+    visible to other connections while the import runs.
+    """
+    if batch_size is None:
+        batch_size = settings.MAILER_IMPORT_BATCH_SIZE
+
+    def flush(batch):
+        inserted = insert_emails(
+            campaign, [(name, recipient_email) for _, _, name, recipient_email in batch.values()]
+        )
+        result.inserted += len(inserted)
+        for key, (source, row_number, name, recipient_email) in batch.items():
+            if key not in inserted:
+                result.add_duplicate(source, row_number, recipient_email)
+        result.save_outcomes()
+        if progress is not None:
+            progress(result)
+
+    with transaction.atomic() if progress is None else contextlib.nullcontext():
+        # lowercased address -> (source, row number, name, address) for the
+        # current batch
+        batch = {}
+
+        for row in rows:
+            key = row[3].lower()
+            if key in batch:
+                result.add_duplicate(row[0], row[1], row[3])
+                continue
+            batch[key] = row
+
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = {}
+
+        flush(batch)
+
+    return result
+
+
+class CopyStream:
+    """Read-only file object over an iterator of text chunks, for COPY FROM STDIN."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = ""
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            try:
+                self.buffer += next(self.chunks)
+            except StopIteration:
+                break
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+def copy_rows(campaign, rows, job=None):
+    """Validate (row_number, name, email_address) rows and COPY them into the campaign.
+
+    See copy_valid_rows; with a ``job``, rows that are not inserted go to
+    its report.
+    """
+    result = ImportResult(job)
+    return copy_valid_rows(campaign, iter_valid_rows(rows, result), result)
+
+
+def copy_valid_rows(campaign, rows, result):
+    """Bulk-ingest validated rows with PostgreSQL COPY instead of batched INSERTs.
+
+    Rows are streamed as CSV through COPY ... FROM STDIN into a temporary
+    staging table, then merged into the Email table in one statement that
+    keeps the first occurrence of each address in the upload and lets the
+    unique index drop addresses the campaign already has. No model
+    instances or bind parameters are built per row, and when ``result`` has
+    a job the rows that are not inserted are written to its report by the
+    same statement. Invalid rows are held in memory until the COPY
+    completes. PostgreSQL only.
+    """
+
+    def csv_chunks():
+        out = io.StringIO()
+        writer = csv.writer(out)
+        for row in rows:
+            writer.writerow(row)
+            if out.tell() >= 64 * 1024:
+                yield out.getvalue()
+                out.seek(0)
+                out.truncate()
+        yield out.getvalue()
+
+    table = connection.ops.quote_name(Email._meta.db_table)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # seq keeps the order rows arrived in, which decides the first
+        # occurrence of an address
+        cursor.execute(
+            "CREATE TEMPORARY TABLE mailer_email_stage "
+            "(seq bigserial, source text, row_number integer, name text, email_address text) "
+            "ON COMMIT DROP"
+        )
+        # rows are read while the COPY runs, when the connection cannot take
+        # another statement, so invalid rows are reported once it is done
+        result.autoflush = False
+        try:
+            cursor.copy_expert(
+                "COPY mailer_email_stage (source, row_number, name, email_address) "
+                "FROM STDIN WITH (FORMAT csv)",
+                CopyStream(csv_chunks()),
+            )
+        finally:
+            result.autoflush = True
+        result.save_outcomes()
+
+        # insert the first row of every address, then report every staged row
+        # that did not make it in: repeats within the upload and addresses the
+        # campaign already had
+        if result.job is None:
+            report = "SELECT count(*)"
+            params = [campaign.campaign_id, timezone.now()]
+        else:
+            outcomes = ImportRowOutcome._meta
+            outcome_columns = ", ".join(
+                connection.ops.quote_name(outcomes.get_field(name).column)
+                for name in ("job_id", "source", "row_number", "outcome", "email_address", "error")
+            )
+            report = (
+                f"INSERT INTO {connection.ops.quote_name(outcomes.db_table)} ({outcome_columns}) "
+                f"SELECT %s, coalesce(stage.source, ''), stage.row_number, %s, stage.email_address, ''"
+            )
+            params = [
+                campaign.campaign_id,
+                timezone.now(),
+                result.job.job_id,
+                ImportRowOutcome.OUTCOME_DUPLICATE,
+            ]
+
+        cursor.execute(
+            f"""
+            WITH picked AS (
+                SELECT DISTINCT ON (lower(email_address)) seq, name, email_address
+                FROM mailer_email_stage
+                ORDER BY lower(email_address), seq
+            ),
+            inserted AS (
+                INSERT INTO {table} ({email_columns()})
+                SELECT email_address, coalesce(name, ''), %s, %s FROM picked
+                -- ids in file order, as the batched inserts give them
+                ORDER BY seq
+                ON CONFLICT DO NOTHING
+                RETURNING lower(email_address) AS address
+            )
+            {report}
+            FROM mailer_email_stage stage
+            WHERE NOT EXISTS (
+                SELECT 1 FROM picked
+                JOIN inserted ON inserted.address = lower(picked.email_address)
+                WHERE picked.seq = stage.seq
+            )
+            {"" if result.job is None else "ORDER BY stage.seq"}
+            """,
+            params,
+        )
+        result.duplicates = (
+            cursor.rowcount if result.job is not None else cursor.fetchone()[0]
+        )
+        cursor.execute("SELECT count(*) FROM mailer_email_stage")
+        result.inserted = cursor.fetchone()[0] - result.duplicates
+        result.save_outcomes()
+        add_recipients(campaign.campaign_id, result.inserted)
+
+    return result
+
+
+# a workbook sheet (the active one if sheet_name is None) or CSV file on
+# local disk; label names it in import reports
+ImportSource = namedtuple("ImportSource", ["label", "path", "sheet_name"])
+
+
+def iter_source_rows(source):
+    """Yield (row_number, name, email_address) rows of an ImportSource."""
+    with open(source.path, "rb") as file:
+        if source.path.lower().endswith(".csv"):
+            yield from iter_csv_rows(file)
+        else:
+            yield from iter_xlsx_rows(file, source.sheet_name)
+
+
+def list_sources(job, directory):
+    """Expand a job's uploads into the ImportSources to parse.
+
+    Zip bundles are extracted into ``directory``; with ``all_sheets`` every
+    sheet of every workbook becomes its own source, so sheets can be parsed
+    in parallel like separate files.
+    """
+    files = []
+    for upload in job.files.order_by("file_id"):
+        if not upload.file_name.lower().endswith(BUNDLE_EXTENSIONS):
+            files.append((upload.file_name, upload.file.path))
+            continue
+
+        with zipfile.ZipFile(upload.file.path) as bundle:
+            for index, member in enumerate(bundle.infolist()):
+                name = member.filename
+                if (
+                    member.is_dir()
+                    or name.startswith("__MACOSX/")
+                    or os.path.basename(name).startswith(".")
+                    or not name.lower().endswith(UPLOAD_EXTENSIONS)
+                ):
+                    continue
+                path = os.path.join(
+                    directory, f"{upload.file_id}-{index}{os.path.splitext(name)[1].lower()}"
+                )
+                with bundle.open(member) as src, open(path, "wb") as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                files.append((f"{upload.file_name}/{name}", path))
+
+    sources = []
+    for label, path in files:
+        if not job.all_sheets or path.lower().endswith(".csv"):
+            sources.append(ImportSource(label, path, None))
+            continue
+        wb = openpyxl.load_workbook(path, read_only=True)
+        try:
+            sources.extend(ImportSource(f"{label}!{name}", path, name) for name in wb.sheetnames)
+        finally:
+            wb.close()
+    return sources
+
+
+# set in each parse worker process by init_parse_worker
+parse_queue = None
+parse_stop = None
+
+
+def init_parse_worker(chunks, stop):
+    global parse_queue, parse_stop
+    parse_queue = chunks
+    parse_stop = stop
+    # don't let a worker's exit wait on chunks the importer stopped reading;
+    # on a normal run it has read them all before the pool shuts down
+    chunks.cancel_join_thread()
+
+
+def parse_source(source):
+    """Parse and validate one source in a worker process.
+
+    Chunks of (label, row count, valid rows, invalid rows) go back to the
+    importing process over the shared queue, followed by a final
+    (label, None, None, None).
+    """
+
+    def put(item):
+        # the queue is bounded: wait for the importer to catch up, unless it
+        # has given up on the import
+        while not parse_stop.is_set():
+            try:
+                parse_queue.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        for chunk in chunked(iter_source_rows(source), VALIDATION_CHUNK_SIZE):
+            valid, invalid = validate_rows(chunk)
+            if not put((source.label, len(chunk), valid, invalid)):
+                return
+    finally:
+        put((source.label, None, None, None))
+
+
+class ParallelParser:
+    """Parse import sources in a pool of worker processes.
+
+    openpyxl parsing is CPU-bound and holds the GIL, so each source (file
+    or sheet) is parsed and validated in its own process, and validated
+    chunks stream back over a bounded queue into the single insert stage
+    as they are ready. Memory stays at a few chunks per process. A single
+    source, or ``processes`` of 1, is parsed in-process instead.
+
+    Enter it outside any transaction: the worker processes are forked on
+    entry, after the database connections are closed so that no process
+    shares them.
+    """
+
+    def __init__(self, sources, processes=None):
+        if processes is None:
+            processes = settings.MAILER_IMPORT_PROCESSES
+        self.sources = sources
+        self.processes = max(1, min(processes, len(sources)))
+        self.pool = None
+
+    def __enter__(self):
+        if self.processes > 1:
+            connections.close_all()
+            # fork, so the workers inherit the configured Django project
+            context = multiprocessing.get_context("fork")
+            self.chunks = context.Queue(maxsize=self.processes * 4)
+            self.stop = context.Event()
+            self.pool = ProcessPoolExecutor(
+                self.processes,
+                mp_context=context,
+                initializer=init_parse_worker,
+                initargs=(self.chunks, self.stop),
+            )
+            self.futures = [self.pool.submit(parse_source, source) for source in self.sources]
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.pool is not None:
+            self.stop.set()
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+
+    def rows(self, result):
+        """Yield the validated (source, row_number, name, email_address) rows.
+
+        Rows of one source come in file order; sources are interleaved in
+        the order their chunks finish parsing.
+        """
+        if self.pool is None:
+            for source in self.sources:
+                yield from iter_valid_rows(iter_source_rows(source), result, source.label)
+            return
+
+        remaining = len(self.sources)
+        while remaining:
+            try:
+                label, count, valid, invalid = self.chunks.get(timeout=1)
+            except queue.Empty:
+                # a worker that died cannot send its end marker
+                for future in self.futures:
+                    if future.done() and future.exception() is not None:
+                        raise future.exception()
+                continue
+
+            if count is None:
+                remaining -= 1
+                continue
+            result.rows += count
+            for row_number, value, error in invalid:
+                result.add_invalid(label, row_number, value, error)
+            for row in valid:
+                yield (label,) + row
+
+        # re-raise parse errors
+        for future in self.futures:
+            future.result()
+
+
+class ImportLeaseLost(Exception):
+    """Another import_worker took the job over after our lease ran out."""
+
+
+def claim_next_import(worker_id):
+    """Claim and lease the next import job, or return None.
+
+    That is the oldest queued job, or a running one whose lease ran out
+    because its worker died. A job taken over this way starts over: its
+    report and counters are cleared, and rows the dead worker had already
+    inserted are reported as duplicates this time. Jobs of deleted
+    campaigns are left for purge_campaigns.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            ImportJob.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(
+                Q(status=ImportJob.STATUS_QUEUED)
+                | Q(status=ImportJob.STATUS_RUNNING, lease_expires_at__lt=now)
+            )
+            .filter(campaign_id__deleted_at__isnull=True)
+            .order_by("created_at")
+            .first()
+        )
+        if job is None:
+            return None
+        if job.status == ImportJob.STATUS_RUNNING:
+            job.outcomes.all().delete()
+            job.rows_processed = 0
+            job.inserted_count = 0
+            job.duplicate_count = 0
+            job.invalid_count = 0
+        job.status = ImportJob.STATUS_RUNNING
+        job.started_at = now
+        job.leased_by = worker_id
+        job.lease_expires_at = now + timezone.timedelta(
+            seconds=settings.MAILER_IMPORT_LEASE_SECONDS
+        )
+        job.save(
+            update_fields=[
+                "status",
+                "started_at",
+                "leased_by",
+                "lease_expires_at",
+                "rows_processed",
+                "inserted_count",
+                "duplicate_count",
+                "invalid_count",
+            ]
+        )
+    return job
+
+
+def renew_import_lease(job, **fields):
+    """Extend our lease on a running import, saving ``fields`` along with it.
+
+    Raises ImportLeaseLost if another worker has taken the job over.
+    """
+    renewed = ImportJob.objects.filter(
+        job_id=job.job_id, status=ImportJob.STATUS_RUNNING, leased_by=job.leased_by
+    ).update(
+        lease_expires_at=timezone.now()
+        + timezone.timedelta(seconds=settings.MAILER_IMPORT_LEASE_SECONDS),
+        **fields,
+    )
+    if not renewed:
+        raise ImportLeaseLost(job.job_id)
+
+
+def save_import_progress(job, result):
+    renew_import_lease(
+        job,
+        rows_processed=result.rows,
+        inserted_count=result.inserted,
+        duplicate_count=result.duplicates,
+        invalid_count=result.invalid,
+    )
+
+
+def run_import(job):
+    """Parse and insert a claimed job's spooled uploads, then delete them.
+
+    Batched-insert imports publish their counters, and renew the lease,
+    after every batch; COPY imports run in one transaction and publish them
+    when they finish. If another worker has taken the job over in the
+    meantime, the job and its uploads are left to that worker.
+    """
+    result = ImportResult(job)
+    finished = {}
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            sources = list_sources(job, directory)
+            # unpacking a large bundle takes a while, too
+            renew_import_lease(job)
+            with ParallelParser(sources) as parser:
+                rows = parser.rows(result)
+                if job.ingest == ImportJob.INGEST_COPY:
+                    copy_valid_rows(job.campaign_id, rows, result)
+                else:
+                    insert_rows(
+                        job.campaign_id,
+                        rows,
+                        result,
+                        progress=lambda result: save_import_progress(job, result),
+                    )
+    except ImportLeaseLost:
+        return job
+    except (InvalidFileException, zipfile.BadZipFile):
+        finished["status"] = ImportJob.STATUS_FAILED
+        finished["error"] = "Invalid Excel or zip file. Please upload valid files."
+    except Exception as e:
+        finished["status"] = ImportJob.STATUS_FAILED
+        finished["error"] = str(e)
+    else:
+        finished["status"] = ImportJob.STATUS_COMPLETED
+        finished["rows_processed"] = result.rows
+        finished["inserted_count"] = result.inserted
+        finished["duplicate_count"] = result.duplicates
+        finished["invalid_count"] = result.invalid
+
+    finished["finished_at"] = timezone.now()
+    finished["lease_expires_at"] = None
+    if not ImportJob.objects.filter(
+        job_id=job.job_id, status=ImportJob.STATUS_RUNNING, leased_by=job.leased_by
+    ).update(**finished):
+        return job
+    for field, value in finished.items():
+        setattr(job, field, value)
+    for upload in job.files.all():
+        upload.file.delete()
+    return job
@@ -0,0 +1,120 @@
+import csv
+import os
+import tempfile
+import time
+
+import openpyxl
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from mailer.importer import (
+    ImportResult,
+    ImportSource,
+    ParallelParser,
+    copy_rows,
+    import_rows,
+    iter_upload_rows,
+)
+from mailer.models import Campaign
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate an XLSX and a CSV recipient list of the same size and report "
+        "import throughput (rows/sec) for both formats."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows", type=int, default=100000, help="Recipient rows per file."
+        )
+        parser.add_argument(
+            "--insert",
+            action="store_true",
+            help="Also insert the rows into a throwaway campaign (rolled back).",
+        )
+        parser.add_argument(
+            "--copy",
+            action="store_true",
+            help="With --insert, ingest through PostgreSQL COPY instead of batched inserts.",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            nargs="+",
+            help=(
+                "Also parse --sources copies of the XLSX as one bulk import with each "
+                "of these process counts and report the wall time."
+            ),
+        )
+        parser.add_argument(
+            "--sources", type=int, default=4, help="Files in the --processes bulk import."
+        )
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        ingest = copy_rows if options["copy"] else import_rows
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = {
+                ".xlsx": self.write_xlsx(os.path.join(tmp, "bench.xlsx"), rows),
+                ".csv": self.write_csv(os.path.join(tmp, "bench.csv"), rows),
+            }
+
+            for extension, path in paths.items():
+                with open(path, "rb") as f:
+                    upload = File(f, name=os.path.basename(path))
+
+                    started = time.perf_counter()
+                    parsed = sum(1 for _ in iter_upload_rows(upload))
+                    parse_time = time.perf_counter() - started
+                    line = (
+                        f"{extension:<6} {os.path.getsize(path) / 2**20:6.1f} MB  "
+                        f"parse {parsed / parse_time:10.0f} rows/s"
+                    )
+
+                    if options["insert"]:
+                        upload.seek(0)
+                        started = time.perf_counter()
+                        with transaction.atomic():
+                            campaign = Campaign.objects.create(
+                                campaign_name=f"bench_import {time.time()}"
+                            )
+                            result = ingest(campaign, iter_upload_rows(upload))
+                            transaction.set_rollback(True)
+                        import_time = time.perf_counter() - started
+                        line += f"  import {result.rows / import_time:10.0f} rows/s"
+
+                self.stdout.write(line)
+
+            sources = [
+                ImportSource(f"bench-{i}.xlsx", paths[".xlsx"], None)
+                for i in range(options["sources"])
+            ]
+            for processes in options["processes"] or ():
+                started = time.perf_counter()
+                with ParallelParser(sources, processes) as parser:
+                    parsed = sum(1 for _ in parser.rows(ImportResult()))
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"bulk   {len(sources)} files  {processes:2d} processes  "
+                    f"{elapsed:6.2f}s  {parsed / elapsed:10.0f} rows/s"
+                )
+
+    def write_xlsx(self, path, rows):
+        wb = openpyxl.Workbook(write_only=True)
+        sheet = wb.create_sheet()
+        sheet.append(["name", "email_address"])
+        for i in range(rows):
+            sheet.append([f"Recipient {i}", f"recipient{i}@example.com"])
+        wb.save(path)
+        return path
+
+    def write_csv(self, path, rows):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "email_address"])
+            for i in range(rows):
+                writer.writerow([f"Recipient {i}", f"recipient{i}@example.com"])
+        return path
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.template.loader import render_to_string
+
+from mailer.rendering import CompiledTemplate
+from mailer.sending import DEFAULT_MESSAGE, EMAIL_TEMPLATES
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-recipient render_to_string with the compiled template "
+        "render stage used by the send worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--templates",
+            nargs="+",
+            default=sorted(EMAIL_TEMPLATES),
+            help="email_template values to benchmark (default: all).",
+        )
+        parser.add_argument(
+            "--count", type=int, default=1000, help="Recipients to render per run."
+        )
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        names = [f"Recipient <{i}> & co" for i in range(count)]
+
+        for email_template in options["templates"]:
+            if email_template not in EMAIL_TEMPLATES:
+                raise CommandError(f"Unknown email template {email_template!r}.")
+            template_name, _ = EMAIL_TEMPLATES[email_template]
+
+            context = {"message": DEFAULT_MESSAGE}
+            template = CompiledTemplate(template_name, constants=context)
+            # inline images become cid: references, so compare against a full
+            # Django render of the same rewritten source
+            reference = engines["django"].from_string(template.source)
+            for name in names[:10]:
+                if template.render(name=name) != reference.render({**context, "name": name}):
+                    raise CommandError(f"Compiled output differs for {template_name}.")
+
+            # rendered messages are discarded straight away, as the send worker
+            # does after handing them to SMTP, so memory stays flat
+            started = time.perf_counter()
+            for name in names:
+                render_to_string(template_name, {**context, "name": name})
+            baseline = time.perf_counter() - started
+
+            started = time.perf_counter()
+            template = CompiledTemplate(template_name, constants=context)
+            for name in names:
+                template.render(name=name)
+            compiled = time.perf_counter() - started
+
+            self.stdout.write(
+                f"{template_name:<28} render_to_string {baseline / count * 1e6:9.1f} us/msg  "
+                f"compiled {compiled / count * 1e6:8.1f} us/msg  "
+                f"({baseline / compiled:.1f}x)"
+            )
@@ -0,0 +1,75 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from mailer.sending import RateLimiter, SenderPool, build_message
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure send throughput (messages/sec) at several worker counts against "
+        "an SMTP server, e.g. a local sink started with "
+        "`python -m aiosmtpd -n -l localhost:1025`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="localhost")
+        parser.add_argument("--port", type=int, default=1025)
+        parser.add_argument("--use-tls", action="store_true")
+        parser.add_argument("--username", default="")
+        parser.add_argument("--password", default="")
+        parser.add_argument(
+            "--count", type=int, default=1000, help="Messages to send per run."
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            nargs="+",
+            default=[1, 4, 16, 64],
+            help="Worker counts to measure.",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=0,
+            help="Rate limit in messages/sec (default: unlimited).",
+        )
+
+    def handle(self, *args, **options):
+        connection_kwargs = {
+            "backend": "django.core.mail.backends.smtp.EmailBackend",
+            "host": options["host"],
+            "port": options["port"],
+            "use_tls": options["use_tls"],
+            "username": options["username"],
+            "password": options["password"],
+        }
+        html_content = "<p>Hello {}, this is a send benchmark.</p>"
+
+        for workers in options["workers"]:
+            messages = [
+                build_message(
+                    "Send benchmark", html_content.format(i), f"bench{i}@example.com"
+                )
+                for i in range(options["count"])
+            ]
+
+            rate_limiter = RateLimiter(options["rate"]) if options["rate"] else None
+
+            started = time.perf_counter()
+            with SenderPool(
+                workers=workers,
+                connection_kwargs=connection_kwargs,
+                rate_limiter=rate_limiter,
+            ) as pool:
+                results = pool.send_batch(messages)
+            elapsed = time.perf_counter() - started
+
+            details = {
+                "sent": sum(1 for error in results if error is None),
+                "failed": sum(1 for error in results if error is not None),
+            }
+            self.stdout.write(
+                f"workers={workers:<3} {len(messages) / elapsed:10.1f} msg/s  "
+                f"{elapsed:7.2f}s  details={details}"
+            )
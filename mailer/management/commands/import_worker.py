@@ -0,0 +1,51 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+
+from mailer.importer import claim_next_import, run_import
+from mailer.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Import recipient files queued by the upload-xls endpoint. Run as many "
+        "workers as needed; each job is claimed by exactly one of them, and a "
+        "job whose worker died is taken over by another."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when no import is queued instead of polling.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when no import is queued.",
+        )
+
+    def handle(self, *args, **options):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        while True:
+            job = claim_next_import(worker_id)
+            if job is not None:
+                run_import(job)
+                if job.status == ImportJob.STATUS_RUNNING:
+                    self.stdout.write(
+                        f"Import job {job.job_id} was taken over by another worker"
+                    )
+                else:
+                    self.stdout.write(
+                        f"Import job {job.job_id} {job.status}: {job.rows_processed} rows, "
+                        f"{job.inserted_count} inserted"
+                    )
+                continue
+
+            if options["once"]:
+                break
+            time.sleep(options["poll_interval"])
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from mailer.purging import next_campaign_to_purge, purge_campaign
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove campaigns deleted through the delete-campaign endpoint, with "
+        "their recipients and job history, in small chunks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when no deleted campaign is ready to purge instead of polling.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=10.0,
+            help="Seconds to wait between polls when nothing is ready to purge.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Rows deleted per statement (default: MAILER_PURGE_BATCH_SIZE).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            campaign = next_campaign_to_purge()
+            if campaign is not None:
+                # deleting the instance clears its primary key
+                campaign_id = campaign.campaign_id
+                deleted = purge_campaign(campaign, options["batch_size"])
+                self.stdout.write(
+                    f"Purged campaign {campaign_id} ({campaign.campaign_name}): {deleted} rows"
+                )
+                continue
+
+            if options["once"]:
+                break
+            time.sleep(options["poll_interval"])
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from mailer.retries import process_due_retries
+from mailer.sending import RateLimiter, SenderPool
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-send deliveries that failed transiently once their backoff is due. "
+        "Runs separately from send_worker so retries never hold up new sends."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when no retries are due instead of polling.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait between polls when no retries are due.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Due retries to claim per round.",
+        )
+
+    def handle(self, *args, **options):
+        templates = {}
+        with SenderPool(rate_limiter=RateLimiter.from_settings(retries=True)) as sender:
+            while True:
+                processed = process_due_retries(sender, options["batch_size"], templates)
+
+                if processed:
+                    self.stdout.write(f"Retried {processed} deliveries")
+                    continue
+
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
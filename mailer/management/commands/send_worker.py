@@ -0,0 +1,60 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+
+from mailer.models import SendJob
+from mailer.sending import SenderPool, lease_next_batch, plan_next_job, run_send_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Process queued email send jobs created by the send-emails endpoint. "
+        "Run as many workers as needed, on one or many hosts: they lease "
+        "recipient batches and never send the same batch twice."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no job is queued or running instead of polling for new jobs.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait between polls when there is no work.",
+        )
+
+    def handle(self, *args, **options):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        templates = {}
+
+        with SenderPool() as sender:
+            while True:
+                job = plan_next_job()
+                if job is not None:
+                    self.stdout.write(
+                        f"Planned send job {job.job_id} for campaign {job.campaign_id_id}"
+                    )
+
+                batch = lease_next_batch(worker_id)
+                if batch is not None:
+                    finished = run_send_batch(batch, worker_id, sender, templates)
+                    self.stdout.write(
+                        f"Send job {batch.job_id_id}: batch {batch.first_email_id}-"
+                        f"{batch.last_email_id} {'done' if finished else 'released'}"
+                    )
+                    continue
+
+                if job is not None:
+                    continue
+                # other workers may still hold batches that could come back to
+                # us if their lease expires, so --once waits for every job to end
+                if options["once"] and not SendJob.objects.filter(
+                    status__in=[SendJob.STATUS_QUEUED, SendJob.STATUS_RUNNING]
+                ).exists():
+                    break
+                time.sleep(options["poll_interval"])
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.4 on 2026-10-18 02:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailer', '0002_sendjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryRecord',
+            fields=[
+                ('record_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('email_address', models.EmailField(max_length=254)),
+                ('status', models.CharField(choices=[('sent', 'Sent'), ('failed', 'Failed')], max_length=20)),
+                ('smtp_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('smtp_response', models.CharField(blank=True, max_length=255)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('email_id', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='mailer.email')),
+                ('job_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='mailer.sendjob')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='deliveryrecord',
+            constraint=models.UniqueConstraint(fields=('job_id', 'email_id'), name='delivery_job_email_uniq'),
+        ),
+    ]
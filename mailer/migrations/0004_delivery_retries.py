@@ -0,0 +1,32 @@
+# Generated by Django 4.2.4 on 2026-10-18 02:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailer', '0003_deliveryrecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliveryrecord',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='deliveryrecord',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='deliveryrecord',
+            name='status',
+            field=models.CharField(choices=[('sent', 'Sent'), ('failed', 'Failed'), ('retry', 'Retry'), ('dead', 'Dead letter')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='deliveryrecord',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='delivery_status_due_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.4 on 2026-10-18 02:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailer', '0004_delivery_retries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SendBatch',
+            fields=[
+                ('batch_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('first_email_id', models.IntegerField()),
+                ('last_email_id', models.IntegerField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('leased', 'Leased'), ('done', 'Done')], default='pending', max_length=20)),
+                ('leased_by', models.CharField(blank=True, max_length=255)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('job_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batches', to='mailer.sendjob')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['job_id', 'status'], name='sendbatch_job_status_idx')],
+            },
+        ),
+    ]
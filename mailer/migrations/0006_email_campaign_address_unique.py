@@ -0,0 +1,50 @@
+# Generated by Django 4.2.4 on 2026-10-18 02:46
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+    # build the unique index without blocking writes to a large mailer_email
+    atomic = False
+
+    dependencies = [
+        ('mailer', '0005_sendbatch'),
+    ]
+
+    operations = [
+        # keep the oldest row of every (campaign, address) pair that differs
+        # only by case, so the unique index can be built
+        migrations.RunSQL(
+            """
+            DELETE FROM mailer_email newer
+            USING mailer_email older
+            WHERE newer.campaign_id_id = older.campaign_id_id
+              AND lower(newer.email_address) = lower(older.email_address)
+              AND newer.email_id > older.email_id
+            """,
+            migrations.RunSQL.noop,
+        ),
+        # an expression constraint is a unique index; build it concurrently.
+        # A failed concurrent build leaves an invalid index behind, which is
+        # dropped when the migration is run again.
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    "DROP INDEX CONCURRENTLY IF EXISTS email_campaign_address_uniq",
+                    migrations.RunSQL.noop,
+                ),
+                migrations.RunSQL(
+                    "CREATE UNIQUE INDEX CONCURRENTLY email_campaign_address_uniq "
+                    "ON mailer_email (campaign_id_id, lower(email_address))",
+                    "DROP INDEX CONCURRENTLY IF EXISTS email_campaign_address_uniq",
+                ),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='email',
+                    constraint=models.UniqueConstraint(models.F('campaign_id'), django.db.models.functions.text.Lower('email_address'), name='email_campaign_address_uniq'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.4 on 2026-10-18 02:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailer', '0006_email_campaign_address_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('job_id', models.AutoField(primary_key=True, serialize=False)),
+                ('file', models.FileField(blank=True, upload_to='imports/')),
+                ('file_name', models.CharField(max_length=255)),
+                ('ingest', models.CharField(choices=[('insert', 'Batched inserts'), ('copy', 'PostgreSQL COPY')], default='insert', max_length=10)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('rows_processed', models.PositiveIntegerField(default=0)),
+                ('inserted_count', models.PositiveIntegerField(default=0)),
+                ('duplicate_count', models.PositiveIntegerField(default=0)),
+                ('invalid_count', models.PositiveIntegerField(default=0)),
+                ('invalid_rows', models.JSONField(blank=True, default=list)),
+                ('duplicate_emails', models.JSONField(blank=True, default=list)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('campaign_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='import_jobs', to='mailer.campaign')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='importjob_status_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.4 on 2026-10-18 02:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailer', '0007_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='importjob',
+            index=models.Index(fields=['campaign_id', 'content_hash'], name='importjob_campaign_hash_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.4 on 2026-10-18 02:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailer', '0008_importjob_content_hash'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='importjob',
+            name='duplicate_emails',
+        ),
+        migrations.RemoveField(
+            model_name='importjob',
+            name='invalid_rows',
+        ),
+        migrations.CreateModel(
+            name='ImportRowOutcome',
+            fields=[
+                ('outcome_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('row_number', models.PositiveIntegerField()),
+                ('outcome', models.CharField(choices=[('duplicate', 'Duplicate'), ('invalid', 'Invalid')], max_length=10)),
+                ('email_address', models.CharField(blank=True, max_length=254)),
+                ('error', models.CharField(blank=True, max_length=10)),
+                ('job_id', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='outcomes', to='mailer.importjob')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['job_id', 'outcome_id'], name='importoutcome_job_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.4 on 2026-10-18 02:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def move_files(apps, schema_editor):
+    # jobs still waiting for a worker keep their upload
+    ImportJob = apps.get_model('mailer', 'ImportJob')
+    ImportFile = apps.get_model('mailer', 'ImportFile')
+    ImportFile.objects.bulk_create(
+        ImportFile(job_id=job, file=job.file.name, file_name=job.file_name)
+        for job in ImportJob.objects.exclude(file='')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailer', '0009_importrowoutcome'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportFile',
+            fields=[
+                ('file_id', models.AutoField(primary_key=True, serialize=False)),
+                ('file', models.FileField(blank=True, upload_to='imports/')),
+                ('file_name', models.CharField(max_length=255)),
+                ('job_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='files', to='mailer.importjob')),
+            ],
+        ),
+        migrations.RunPython(move_files, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='importjob',
+            name='file',
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='all_sheets',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='importrowoutcome',
+            name='source',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
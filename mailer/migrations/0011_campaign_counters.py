@@ -0,0 +1,47 @@
+# Generated by Django 4.2.4 on 2026-10-18 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailer', '0010_importfile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='failed_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='campaign',
+            name='recipient_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='campaign',
+            name='sent_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        # backfill the counters of existing campaigns
+        migrations.RunSQL(
+            """
+            UPDATE mailer_campaign campaign SET
+                recipient_count = (
+                    SELECT count(*) FROM mailer_email email
+                    WHERE email.campaign_id_id = campaign.campaign_id
+                ),
+                sent_count = (
+                    SELECT coalesce(sum(job.sent_count), 0) FROM mailer_sendjob job
+                    WHERE job.campaign_id_id = campaign.campaign_id
+                ),
+                failed_count = (
+                    SELECT coalesce(sum(job.failed_count), 0) FROM mailer_sendjob job
+                    WHERE job.campaign_id_id = campaign.campaign_id
+                )
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
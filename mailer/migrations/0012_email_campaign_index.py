@@ -0,0 +1,27 @@
+# Generated by Django 4.2.4 on 2026-10-18 03:08
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    # build the index without blocking writes to a large mailer_email
+    atomic = False
+
+    dependencies = [
+        ('mailer', '0011_campaign_counters'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='email',
+            index=models.Index(fields=['campaign_id', 'email_id'], include=('email_address', 'name'), name='email_campaign_idx'),
+        ),
+        # the new index leads with campaign_id, so the FK's own index is redundant
+        migrations.AlterField(
+            model_name='email',
+            name='campaign_id',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='emails', to='mailer.campaign'),
+        ),
+    ]
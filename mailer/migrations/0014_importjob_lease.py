@@ -0,0 +1,23 @@
+# Generated by Django 4.2.4 on 2026-10-18 03:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailer', '0013_campaign_soft_delete'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='leased_by',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
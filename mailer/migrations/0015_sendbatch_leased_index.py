@@ -0,0 +1,17 @@
+# Generated by Django 4.2.4 on 2026-10-18 03:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailer', '0014_importjob_lease'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sendbatch',
+            index=models.Index(condition=models.Q(('status', 'leased')), fields=['lease_expires_at'], name='sendbatch_leased_idx'),
+        ),
+    ]
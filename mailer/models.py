@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 
 # Create your models here.
 # class Email(models.Model):
@@ -9,11 +10,47 @@ from django.db import models
 #     # compaign_name = models.CharField(prmarykey = 'yes') 
 #     pass
 
+class CampaignManager(models.Manager):
+    """Campaigns that have not been deleted."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Campaign(models.Model):
     campaign_id = models.AutoField(primary_key=True)
-    campaign_name = models.CharField(max_length=255, unique=True)
+    campaign_name = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # maintained with F() by imports, deletes and sends; sent/failed are the
+    # totals of the campaign's send jobs
+    recipient_count = models.PositiveIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    # set by delete-campaign; the purge_campaigns worker then removes the
+    # campaign and its rows in the background
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = CampaignManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        # a deleted campaign's name can be reused before it is purged
+        constraints = [
+            models.UniqueConstraint(
+                fields=['campaign_name'],
+                condition=models.Q(deleted_at__isnull=True),
+                name='campaign_name_uniq',
+            ),
+        ]
+        # the purge worker polls for deleted campaigns
+        indexes = [
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(deleted_at__isnull=False),
+                name='campaign_deleted_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.campaign_name
@@ -22,11 +59,234 @@ class Campaign(models.Model):
 class Email(models.Model):
     email_id = models.AutoField(primary_key=True)
     email_address = models.EmailField()
-    campaign_id = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='emails')
+    # indexed by email_campaign_idx below
+    campaign_id = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='emails', db_index=False)
     name = models.CharField(max_length=255)
     added_at = models.DateTimeField(auto_now_add=True)
     # subject = models.CharField(max_length=255)
     # message = models.TextField()
 
+    class Meta:
+        constraints = [
+            # one address per campaign, whatever its case; imports rely on this
+            # index to drop duplicates (INSERT ... ON CONFLICT DO NOTHING), and
+            # lookups by address filter on lower(email_address) to use it
+            models.UniqueConstraint(
+                models.F('campaign_id'), Lower('email_address'), name='email_campaign_address_uniq'
+            ),
+        ]
+        indexes = [
+            # campaign pages, exports and send batches are keyset reads in
+            # email_id order; including the send projection makes them
+            # index-only scans
+            models.Index(
+                fields=['campaign_id', 'email_id'],
+                include=['email_address', 'name'],
+                name='email_campaign_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} <{self.email_address}>"
+
+
+class SendJob(models.Model):
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    job_id = models.AutoField(primary_key=True)
+    campaign_id = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='send_jobs')
+    email_template = models.CharField(max_length=10)
+    message = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        # workers poll for the oldest queued job
+        indexes = [models.Index(fields=['status', 'created_at'], name='sendjob_status_created_idx')]
+
+    def __str__(self):
+        return f"Send job {self.job_id} ({self.status})"
+
+
+class SendBatch(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_LEASED = "leased"
+    STATUS_DONE = "done"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_LEASED, "Leased"),
+        (STATUS_DONE, "Done"),
+    ]
+
+    batch_id = models.BigAutoField(primary_key=True)
+    job_id = models.ForeignKey(SendJob, on_delete=models.CASCADE, related_name='batches')
+    # inclusive range of Email.email_id values in the job's campaign
+    first_email_id = models.IntegerField()
+    last_email_id = models.IntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    leased_by = models.CharField(max_length=255, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['job_id', 'status'], name='sendbatch_job_status_idx'),
+            # send workers count who holds a live lease to divide the rate limit
+            models.Index(
+                fields=['lease_expires_at'],
+                name='sendbatch_leased_idx',
+                condition=models.Q(status='leased'),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Batch {self.first_email_id}-{self.last_email_id} of job {self.job_id_id} ({self.status})"
+
+
+class DeliveryRecord(models.Model):
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"  # permanent rejection
+    STATUS_RETRY = "retry"  # transient failure, waiting for next_attempt_at
+    STATUS_DEAD = "dead"  # retries exhausted, kept for inspection and replay
+    STATUS_CHOICES = [
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed"),
+        (STATUS_RETRY, "Retry"),
+        (STATUS_DEAD, "Dead letter"),
+    ]
+
+    record_id = models.BigAutoField(primary_key=True)
+    job_id = models.ForeignKey(SendJob, on_delete=models.CASCADE, related_name='deliveries')
+    # no database constraint: the ledger keeps its history when a recipient is
+    # deleted, and deleting recipients never has to touch this table
+    email_id = models.ForeignKey(Email, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    email_address = models.EmailField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    smtp_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    smtp_response = models.CharField(max_length=255, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=1)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job_id', 'email_id'], name='delivery_job_email_uniq'),
+        ]
+        # the retry worker's due-time queue
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='delivery_status_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.email_address} ({self.status})"
+
+
+class ImportJob(models.Model):
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    INGEST_INSERT = "insert"
+    INGEST_COPY = "copy"
+    INGEST_CHOICES = [
+        (INGEST_INSERT, "Batched inserts"),
+        (INGEST_COPY, "PostgreSQL COPY"),
+    ]
+
+    job_id = models.AutoField(primary_key=True)
+    campaign_id = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='import_jobs')
+    # names of the uploaded files, for display
+    file_name = models.CharField(max_length=255)
+    # SHA-256 of the upload(s); identical re-uploads reuse this job's result
+    content_hash = models.CharField(max_length=64, blank=True)
+    ingest = models.CharField(max_length=10, choices=INGEST_CHOICES, default=INGEST_INSERT)
+    # import every sheet of each workbook instead of only the active one
+    all_sheets = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    rows_processed = models.PositiveIntegerField(default=0)
+    inserted_count = models.PositiveIntegerField(default=0)
+    duplicate_count = models.PositiveIntegerField(default=0)
+    invalid_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    # the import_worker running the job and until when it holds it; a running
+    # job whose lease ran out (its worker died) is claimed again
+    leased_by = models.CharField(max_length=255, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # import workers poll for the oldest queued job
+            models.Index(fields=['status', 'created_at'], name='importjob_status_created_idx'),
+            # repeat uploads are looked up by content
+            models.Index(fields=['campaign_id', 'content_hash'], name='importjob_campaign_hash_idx'),
+        ]
+
+    def __str__(self):
+        return f"Import job {self.job_id} ({self.status})"
+
+
+class ImportFile(models.Model):
+    """One uploaded file (workbook, CSV or zip bundle) of an import job."""
+
+    file_id = models.AutoField(primary_key=True)
+    job_id = models.ForeignKey(ImportJob, on_delete=models.CASCADE, related_name='files')
+    # the spooled upload; removed once the import has run
+    file = models.FileField(upload_to='imports/', blank=True)
+    file_name = models.CharField(max_length=255)
+
+    def __str__(self):
+        return self.file_name
+
+
+class ImportRowOutcome(models.Model):
+    """A row of an import that was not inserted, and why."""
+
+    OUTCOME_DUPLICATE = "duplicate"
+    OUTCOME_INVALID = "invalid"
+    OUTCOME_CHOICES = [
+        (OUTCOME_DUPLICATE, "Duplicate"),
+        (OUTCOME_INVALID, "Invalid"),
+    ]
+
+    outcome_id = models.BigAutoField(primary_key=True)
+    job_id = models.ForeignKey(ImportJob, on_delete=models.CASCADE, related_name='outcomes', db_index=False)
+    # file (and sheet) the row came from, e.g. "bundle.zip/list.xlsx!Sheet2"
+    source = models.CharField(max_length=255, blank=True)
+    row_number = models.PositiveIntegerField()
+    outcome = models.CharField(max_length=10, choices=OUTCOME_CHOICES)
+    # the address as found in the file (truncated for invalid rows)
+    email_address = models.CharField(max_length=254, blank=True)
+    # validation error code, see mailer.validation.ERROR_MESSAGES
+    error = models.CharField(max_length=10, blank=True)
+
+    class Meta:
+        # reports are read a page at a time in outcome_id order
+        indexes = [models.Index(fields=['job_id', 'outcome_id'], name='importoutcome_job_idx')]
+
     def __str__(self):
-        return f"{self.name} <{self.email_address}>"
\ No newline at end of file
+        return f"Row {self.row_number} ({self.outcome})"
@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .caching import invalidate_campaign_list
+from .models import (
+    Campaign,
+    DeliveryRecord,
+    Email,
+    ImportFile,
+    ImportJob,
+    ImportRowOutcome,
+    SendBatch,
+    SendJob,
+)
+
+CAMPAIGN_DELETED = "Campaign deleted."
+
+
+def delete_campaign(campaign_id):
+    """Mark a campaign deleted and stop its jobs; False if there is no such campaign.
+
+    This only touches the campaign and job rows, so it returns at once
+    whatever the campaign size; purge_campaigns removes the rest later.
+    Queued and running send jobs fail, so workers lease no more of their
+    batches, and queued imports fail before a worker claims them. An
+    import that is already running is left to finish.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        if not Campaign.objects.filter(campaign_id=campaign_id).update(deleted_at=now):
+            return False
+        SendJob.objects.filter(
+            campaign_id=campaign_id,
+            status__in=[SendJob.STATUS_QUEUED, SendJob.STATUS_RUNNING],
+        ).update(status=SendJob.STATUS_FAILED, error=CAMPAIGN_DELETED, finished_at=now)
+        ImportJob.objects.filter(
+            campaign_id=campaign_id, status=ImportJob.STATUS_QUEUED
+        ).update(status=ImportJob.STATUS_FAILED, error=CAMPAIGN_DELETED, finished_at=now)
+        invalidate_campaign_list()
+    return True
+
+
+def next_campaign_to_purge():
+    """Return the deleted campaign that has waited longest and is ready to purge.
+
+    A campaign waits while an import or send worker still holds an
+    unexpired lease on one of its import jobs or batches, so rows are never
+    removed from under a worker.
+    """
+    now = timezone.now()
+    running_imports = ImportJob.objects.filter(
+        campaign_id=OuterRef("pk"),
+        status=ImportJob.STATUS_RUNNING,
+        lease_expires_at__gt=now,
+    )
+    leased_batches = SendBatch.objects.filter(
+        job_id__campaign_id=OuterRef("pk"),
+        status=SendBatch.STATUS_LEASED,
+        lease_expires_at__gt=now,
+    )
+    return (
+        Campaign.all_objects.filter(deleted_at__isnull=False)
+        .exclude(Exists(running_imports))
+        .exclude(Exists(leased_batches))
+        .order_by("deleted_at")
+        .first()
+    )
+
+
+def delete_in_chunks(queryset, batch_size):
+    """Delete a queryset's rows ``batch_size`` at a time; returns how many went.
+
+    Every chunk is a short statement of its own, so neither locks nor
+    memory grow with the number of rows. The models purged this way have
+    no cascades to follow, so each chunk is a single DELETE.
+    """
+    model = queryset.model
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        count, _ = model.objects.filter(pk__in=pks).delete()
+        deleted += count
+
+
+def purge_campaign(campaign, batch_size=None):
+    """Remove a deleted campaign and everything that belongs to it.
+
+    The large tables (recipients, the delivery ledger, send batches and
+    import reports) are emptied in chunks first; the campaign row then goes
+    together with its few remaining job rows. Purging is idempotent, so an
+    interrupted purge simply continues on the next run. Returns the number
+    of rows deleted.
+    """
+    if batch_size is None:
+        batch_size = settings.MAILER_PURGE_BATCH_SIZE
+
+    deleted = 0
+    for queryset in (
+        DeliveryRecord.objects.filter(job_id__campaign_id=campaign),
+        SendBatch.objects.filter(job_id__campaign_id=campaign),
+        ImportRowOutcome.objects.filter(job_id__campaign_id=campaign),
+        Email.objects.filter(campaign_id=campaign),
+    ):
+        deleted += delete_in_chunks(queryset, batch_size)
+
+    # uploads of imports that never ran are still on disk
+    for import_file in ImportFile.objects.filter(job_id__campaign_id=campaign):
+        if import_file.file:
+            import_file.file.delete(save=False)
+
+    count, _ = campaign.delete()
+    return deleted + count
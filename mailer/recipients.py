@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+
+from .models import Email
+
+RECIPIENT_FIELDS = ("email_id", "email_address", "name")
+
+
+def iter_recipients(campaign_id, chunk_size, fields=RECIPIENT_FIELDS, first_email_id=None, last_email_id=None):
+    """Yield a campaign's recipients as lists of value tuples, ``chunk_size`` at a time.
+
+    Pages are fetched by keyset (``email_id > last seen``) and only the
+    requested columns are selected, so memory stays at one chunk whatever the
+    campaign size, and no transaction or server-side cursor is held open
+    between chunks while the caller works. ``fields`` must start with
+    ``email_id``; ``first_email_id``/``last_email_id`` bound the range
+    (inclusive).
+    """
+    emails = Email.objects.filter(campaign_id=campaign_id).order_by("email_id")
+    if first_email_id is not None:
+        emails = emails.filter(email_id__gte=first_email_id)
+    if last_email_id is not None:
+        emails = emails.filter(email_id__lte=last_email_id)
+
+    page = emails
+    while True:
+        chunk = list(page.values_list(*fields)[:chunk_size])
+        if chunk:
+            yield chunk
+        if len(chunk) < chunk_size:
+            return
+        page = emails.filter(email_id__gt=chunk[-1][0])
+
+
+def export_recipients(campaign_id, export, chunk_size=2000):
+    """Yield a campaign's recipients as ``ndjson`` or ``csv`` text, a keyset chunk at a time."""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    if export == "csv":
+        writer.writerow(["email_id", "email_address", "name", "added_at"])
+
+    fields = ("email_id", "email_address", "name", "added_at")
+    for chunk in iter_recipients(campaign_id, chunk_size, fields=fields):
+        for email_id, email_address, name, added_at in chunk:
+            # same format as the API's JSON responses
+            added_at = added_at.isoformat()
+            if added_at.endswith("+00:00"):
+                added_at = added_at[:-6] + "Z"
+
+            if export == "csv":
+                writer.writerow([email_id, email_address, name, added_at])
+            else:
+                out.write(
+                    json.dumps(
+                        {
+                            "email_id": email_id,
+                            "email_address": email_address,
+                            "name": name,
+                            "campaign_id": campaign_id,
+                            "added_at": added_at,
+                        }
+                    )
+                )
+                out.write("\n")
+        yield out.getvalue()
+        out.seek(0)
+        out.truncate()
+    yield out.getvalue()
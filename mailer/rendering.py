@@ -0,0 +1,128 @@
+import base64
+import hashlib
+import mimetypes
+import os
+import re
+from email.mime.image import MIMEImage
+
+from django.template.loader import get_template
+from django.utils.html import conditional_escape
+
+# the only variables our email templates use
+SLOT_RE = re.compile(r"{{\s*(name|message)\s*}}")
+
+# anything else Django would have to interpret
+TEMPLATE_SYNTAX_RE = re.compile(r"{{|{%|{#")
+
+# images embedded in the markup (<img src="data:..."> and CSS url(data:...))
+DATA_IMAGE_RE = re.compile(r"data:image/([\w.+-]+);base64,([A-Za-z0-9+/=\s]+)")
+
+# <img src="..."> pointing at an image file next to the template
+FILE_IMAGE_RE = re.compile(r"""(src=["'])([^"':]+\.(?:png|jpe?g|gif))(["'])""", re.IGNORECASE)
+
+
+def make_inline_image(data, subtype):
+    """Build a MIME image part once; it is attached as-is to every message."""
+    content_id = f"{hashlib.sha1(data).hexdigest()[:20]}@mailer"
+    image = MIMEImage(data, _subtype=subtype)
+    image.add_header("Content-ID", f"<{content_id}>")
+    image.add_header(
+        "Content-Disposition",
+        "inline",
+        filename=f"{content_id.split('@')[0]}.{subtype.split('+')[0]}",
+    )
+    return content_id, image
+
+
+def extract_inline_images(source, base_dir):
+    """Move embedded and local images out of the markup into CID parts.
+
+    Returns the rewritten source, which references the images as ``cid:``
+    URLs, and the list of MIME parts to attach. Identical images share one
+    part.
+    """
+    images = {}
+
+    def add(data, subtype):
+        content_id, image = make_inline_image(data, subtype)
+        images.setdefault(content_id, image)
+        return f"cid:{content_id}"
+
+    def replace_data(match):
+        data = base64.b64decode("".join(match.group(2).split()))
+        return add(data, match.group(1).lower())
+
+    def replace_file(match):
+        path = os.path.join(base_dir, match.group(2))
+        if not os.path.isfile(path):
+            return match.group(0)
+        mime_type, _ = mimetypes.guess_type(path)
+        with open(path, "rb") as f:
+            cid_url = add(f.read(), mime_type.split("/", 1)[1])
+        return f"{match.group(1)}{cid_url}{match.group(3)}"
+
+    source = DATA_IMAGE_RE.sub(replace_data, source)
+    source = FILE_IMAGE_RE.sub(replace_file, source)
+    return source, list(images.values())
+
+
+class CompiledTemplate:
+    """An email template resolved and compiled once per send job.
+
+    Templates that only use ``{{ name }}``/``{{ message }}`` are split into
+    static chunks around those slots, and slots whose value is the same for
+    every recipient (``constants``) are folded into the chunks up front, so
+    rendering a recipient is a single string join. Templates using any other
+    Django syntax fall back to rendering the compiled template object.
+
+    Inline ``data:image`` blobs and images stored next to the template are
+    pulled out into ``attachments``: MIME parts encoded once per job and
+    referenced from the HTML by Content-ID.
+    """
+
+    def __init__(self, template_name, constants=None):
+        self.template_name = template_name
+        self.constants = dict(constants or {})
+        self.template = get_template(template_name)
+        self.chunks = None
+        self.slots = None
+
+        source, self.attachments = extract_inline_images(
+            self.template.template.source,
+            os.path.dirname(self.template.origin.name),
+        )
+        if self.attachments:
+            self.template = self.template.backend.from_string(source)
+        self.source = source
+
+        if TEMPLATE_SYNTAX_RE.search(SLOT_RE.sub("", source)):
+            return
+
+        chunks = []
+        slots = []
+        current = []
+        parts = SLOT_RE.split(source)
+        # split() alternates text, slot name, text, slot name, ..., text
+        for index, part in enumerate(parts):
+            if index % 2 == 0:
+                current.append(part)
+            elif part in self.constants:
+                current.append(conditional_escape(self.constants[part]))
+            else:
+                chunks.append("".join(current))
+                slots.append(part)
+                current = []
+        chunks.append("".join(current))
+
+        self.chunks = chunks
+        self.slots = slots
+
+    def render(self, **values):
+        if self.chunks is None:
+            return self.template.render({**self.constants, **values})
+
+        pieces = [self.chunks[0]]
+        for slot, chunk in zip(self.slots, self.chunks[1:]):
+            pieces.append(conditional_escape(values.get(slot, "")))
+            pieces.append(chunk)
+        return "".join(pieces)
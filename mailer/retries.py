@@ -0,0 +1,122 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DeliveryRecord, Email, SendJob
+from .sending import (
+    add_campaign_deliveries,
+    cached_job_template,
+    delivery_record,
+    save_delivery_records,
+    send_batch,
+)
+
+# how long a claimed retry stays out of the due queue; if the worker dies the
+# record simply becomes due again after this
+RETRY_LEASE = timezone.timedelta(minutes=10)
+
+
+def claim_due_retries(limit):
+    """Take up to ``limit`` due retry records off the queue.
+
+    Records of deleted campaigns are left for purge_campaigns.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        records = list(
+            DeliveryRecord.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(status=DeliveryRecord.STATUS_RETRY, next_attempt_at__lte=now)
+            .filter(job_id__campaign_id__deleted_at__isnull=True)
+            .order_by("next_attempt_at")[:limit]
+        )
+        DeliveryRecord.objects.filter(
+            record_id__in=[record.record_id for record in records]
+        ).update(next_attempt_at=now + RETRY_LEASE)
+    return records
+
+
+def process_due_retries(sender, limit, templates=None):
+    """Re-send due retry records; returns how many were processed.
+
+    ``templates`` caches compiled templates per job across calls, so a
+    long-running retry worker compiles each job's template once.
+    """
+    if templates is None:
+        templates = {}
+
+    records = claim_due_retries(limit)
+    if not records:
+        return 0
+
+    names = dict(
+        Email.objects.filter(
+            email_id__in=[record.email_id_id for record in records]
+        ).values_list("email_id", "name")
+    )
+    jobs = SendJob.objects.in_bulk({record.job_id_id for record in records})
+
+    by_job = defaultdict(list)
+    for record in records:
+        by_job[record.job_id_id].append(record)
+
+    for job_id, job_records in by_job.items():
+        job = jobs[job_id]
+        template, subject = cached_job_template(templates, job)
+
+        batch = []
+        attempts = {}
+        results = []
+        for record in job_records:
+            attempt = record.attempts + 1
+            if record.email_id_id not in names:
+                results.append(
+                    delivery_record(
+                        job,
+                        record.email_id_id,
+                        record.email_address,
+                        ValueError("Recipient was deleted."),
+                        attempt,
+                    )
+                )
+                continue
+            batch.append((record.email_id_id, record.email_address, names[record.email_id_id]))
+            attempts[record.email_id_id] = attempt
+
+        results.extend(send_batch(job, template, subject, sender, batch, attempts))
+        save_delivery_records(job, results)
+
+    return len(records)
+
+
+def replay_dead_letters(job):
+    """Put a job's dead letters back on the retry queue with a fresh retry budget.
+
+    Only dead letters written since the job's current run started are in
+    its failed counters: a resume resets the counters and sends older ones
+    again. Those older ones are requeued without touching the counters.
+    """
+    dead = DeliveryRecord.objects.filter(job_id=job, status=DeliveryRecord.STATUS_DEAD)
+    retry = {
+        "status": DeliveryRecord.STATUS_RETRY,
+        "attempts": 0,
+        "next_attempt_at": timezone.now(),
+    }
+    with transaction.atomic():
+        # the lock keeps a concurrent resume from resetting the counters
+        # between the two updates
+        started_at = (
+            SendJob.objects.select_for_update()
+            .values_list("started_at", flat=True)
+            .get(job_id=job.job_id)
+        )
+        counted = 0
+        if started_at is not None:
+            counted = dead.filter(updated_at__gte=started_at).update(**retry)
+        replayed = counted + dead.update(**retry)
+        SendJob.objects.filter(job_id=job.job_id).update(
+            failed_count=F("failed_count") - counted
+        )
+        add_campaign_deliveries(job.campaign_id_id, 0, -counted)
+    return replayed
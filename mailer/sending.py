@@ -0,0 +1,710 @@
+import random
+import smtplib
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .caching import invalidate_campaign_list
+from .models import Campaign, DeliveryRecord, SendBatch, SendJob
+from .recipients import iter_recipients
+from .rendering import CompiledTemplate
+
+FROM_EMAIL = "info@autosad.ai"
+
+DEFAULT_MESSAGE = "Thank you for applying to the AUTOSAD Get Certified program. We're thrilled to have you on board and look forward to helping you gain the knowledge and credentials to excel in the AUTOSAD ecosystem. To finalize your enrollment and start your certification journey, simply click the link below to complete your registration process."
+
+# email_template query value -> (template file, subject)
+EMAIL_TEMPLATES = {
+    "1": ("autosad-temp-email.html", "Welcome to AUTOSAD Get Certified"),
+    "2": ("XCV_AI.html", "Welcome onboard to XCV AI"),
+    "3": ("autosad-temp-email2.html", "Welcome to AUTOSAD Get Certified"),
+    "4": ("autosad-email-temp-3.html", "Welcome to AUTOSAD"),
+}
+
+# errors that mean the SMTP session itself is gone, as opposed to the server
+# rejecting one message on an otherwise healthy connection
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, socket.timeout)
+
+# provider replies meaning "slow down", not "this recipient is bad"
+THROTTLE_CODES = {421, 450, 451}
+
+
+def smtp_code(error):
+    """Return the SMTP reply code carried by a send error, if any."""
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code
+    if isinstance(error, smtplib.SMTPRecipientsRefused) and error.recipients:
+        return next(iter(error.recipients.values()))[0]
+    return None
+
+
+def is_transient(error):
+    """Whether a send error is worth retrying later.
+
+    4xx replies and dropped/refused connections are transient. 5xx replies,
+    other SMTP protocol errors and anything raised before the message
+    reached the server (e.g. rendering) are permanent.
+    """
+    code = smtp_code(error)
+    if code is not None:
+        return 400 <= code < 500
+    if isinstance(error, RECONNECT_ERRORS):
+        return True
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    return isinstance(error, OSError)
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter for the given number of failed attempts."""
+    delay = min(
+        settings.MAILER_RETRY_MAX_SECONDS,
+        settings.MAILER_RETRY_BASE_SECONDS * 2 ** (attempts - 1),
+    )
+    # half fixed, half random, so retries of one outage don't arrive in lockstep
+    return timezone.timedelta(seconds=delay / 2 + random.uniform(0, delay / 2))
+
+
+class RateLimiter:
+    """Token bucket shared by every sending thread of a process.
+
+    Tokens refill at ``rate`` messages/sec. When the provider answers with a
+    throttling code the rate is cut by ``backoff_factor`` (down to
+    ``min_rate``) and sending pauses briefly. After ``recovery_seconds``
+    without throttling it climbs back towards the configured rate in 10%
+    steps, so sending settles just under the provider's real ceiling.
+    """
+
+    def __init__(self, rate, burst=None, min_rate=0.5, recovery_seconds=30.0, backoff_factor=0.5):
+        self.limits = (float(rate), float(burst or max(1.0, rate)), float(min_rate))
+        self.share = 1.0
+        self.max_rate = float(rate)
+        self.rate = self.max_rate
+        self.max_burst = self.limits[1]
+        self.min_rate = min(float(min_rate), self.max_rate)
+        self.recovery_seconds = recovery_seconds
+        self.backoff_factor = backoff_factor
+        self.updated_at = time.monotonic()
+        self.healthy_since = self.updated_at - recovery_seconds
+        self.tokens = self.capacity
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, retries=False):
+        """Build a limiter from settings, or None when unlimited.
+
+        send_retry_worker (``retries``) gets MAILER_RETRY_RATE_LIMIT of
+        MAILER_RATE_LIMIT, at most half of it. The rest belongs to the send
+        workers, which divide it between them with set_share as they come
+        and go (see run_send_batch).
+        """
+        if not settings.MAILER_RATE_LIMIT:
+            return None
+        retry_rate = min(settings.MAILER_RETRY_RATE_LIMIT, settings.MAILER_RATE_LIMIT / 2)
+        if retries:
+            fraction = retry_rate / settings.MAILER_RATE_LIMIT
+        else:
+            fraction = 1 - retry_rate / settings.MAILER_RATE_LIMIT
+        return cls(
+            rate=settings.MAILER_RATE_LIMIT * fraction,
+            burst=settings.MAILER_RATE_BURST * fraction or None,
+            min_rate=settings.MAILER_RATE_MIN * fraction,
+            recovery_seconds=settings.MAILER_RATE_RECOVERY_SECONDS,
+        )
+
+    def set_share(self, share):
+        """Run at ``share`` of the limits the limiter was built with.
+
+        A throttling backoff in effect is kept, scaled along with the rate.
+        """
+        with self._lock:
+            if share == self.share:
+                return
+            self._refill(time.monotonic())
+            rate, burst, min_rate = self.limits
+            self.rate *= share / self.share
+            self.max_rate = rate * share
+            self.max_burst = burst * share
+            self.min_rate = min(min_rate * share, self.max_rate)
+            self.rate = max(self.min_rate, min(self.max_rate, self.rate))
+            self.tokens = min(self.tokens, self.capacity)
+            self.share = share
+
+    @property
+    def capacity(self):
+        # never allow a burst larger than one second's worth at the current rate
+        return max(1.0, min(self.max_burst, self.rate))
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def throttled(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # several threads usually hit the same throttling episode; cut the
+            # rate once per episode rather than once per refused message
+            if now - self.healthy_since >= 1.0:
+                self.rate = max(self.min_rate, self.rate * self.backoff_factor)
+            # go into debt for a full bucket: everyone pauses about a second
+            # before the provider sees the next message
+            self.tokens = -self.capacity
+            self.healthy_since = now
+
+    def succeeded(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.rate < self.max_rate and now - self.healthy_since >= self.recovery_seconds:
+                self._refill(now)
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+                self.healthy_since = now
+
+
+class BatchSender:
+    """Send messages over one reused connection from the configured backend.
+
+    The connection is opened on first use, recycled after
+    ``max_messages_per_connection`` messages and reopened once if the server
+    drops it mid-send, so the TCP/STARTTLS/AUTH handshake is paid once per
+    connection instead of once per recipient.
+    """
+
+    def __init__(self, max_messages_per_connection=None, connection_kwargs=None):
+        if max_messages_per_connection is None:
+            max_messages_per_connection = settings.MAILER_MAX_MESSAGES_PER_CONNECTION
+        self.max_messages_per_connection = max_messages_per_connection
+        # extra get_connection() arguments, e.g. host/port of a local SMTP sink
+        self.connection_kwargs = connection_kwargs or {}
+        self.connection = None
+        self.sent_on_connection = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open(self):
+        if self.connection is None:
+            connection = get_connection(fail_silently=False, **self.connection_kwargs)
+            connection.open()
+            self.connection = connection
+            self.sent_on_connection = 0
+        return self.connection
+
+    def close(self):
+        if self.connection is None:
+            return
+        try:
+            self.connection.close()
+        except smtplib.SMTPException:
+            pass
+        finally:
+            self.connection = None
+
+    def send(self, message):
+        if self.sent_on_connection >= self.max_messages_per_connection:
+            self.close()
+
+        try:
+            self.open().send_messages([message])
+        except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+            # the server answered, so the session is still usable
+            raise
+        except RECONNECT_ERRORS:
+            # the server hung up (idle timeout, provider limit, network blip):
+            # reconnect once and retry this message before giving up on it
+            self.close()
+            try:
+                self.open().send_messages([message])
+            except Exception:
+                self.close()
+                raise
+        except Exception:
+            self.close()
+            raise
+
+        self.sent_on_connection += 1
+
+    def send_batch(self, messages):
+        """Send each message and return a list of exceptions (None on success)."""
+        results = []
+        for message in messages:
+            try:
+                self.send(message)
+                results.append(None)
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+class SenderPool:
+    """Send messages in parallel over a bounded pool of worker threads.
+
+    Every worker thread owns a BatchSender, so each keeps its own persistent
+    connection. ``send_batch`` has the same contract as
+    ``BatchSender.send_batch``: results come back in input order.
+
+    All threads draw from one RateLimiter. A message refused with a
+    throttling code is retried (up to MAILER_THROTTLE_RETRIES times) once
+    the limiter has slowed down, instead of being counted as failed.
+    """
+
+    def __init__(
+        self,
+        workers=None,
+        max_messages_per_connection=None,
+        connection_kwargs=None,
+        rate_limiter="settings",
+    ):
+        if workers is None:
+            workers = settings.MAILER_SEND_WORKERS
+        if rate_limiter == "settings":
+            rate_limiter = RateLimiter.from_settings()
+        self.workers = max(1, workers)
+        self.rate_limiter = rate_limiter
+        self.max_messages_per_connection = max_messages_per_connection
+        self.connection_kwargs = connection_kwargs
+        self._local = threading.local()
+        self._senders = []
+        self._senders_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="mailer-send"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _sender(self):
+        sender = getattr(self._local, "sender", None)
+        if sender is None:
+            sender = BatchSender(
+                max_messages_per_connection=self.max_messages_per_connection,
+                connection_kwargs=self.connection_kwargs,
+            )
+            self._local.sender = sender
+            with self._senders_lock:
+                self._senders.append(sender)
+        return sender
+
+    def _send(self, message):
+        throttle_retries = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+
+            try:
+                self._sender().send(message)
+            except Exception as e:
+                if (
+                    self.rate_limiter is None
+                    or smtp_code(e) not in THROTTLE_CODES
+                    or throttle_retries >= settings.MAILER_THROTTLE_RETRIES
+                ):
+                    return e
+                self.rate_limiter.throttled()
+                throttle_retries += 1
+                continue
+
+            if self.rate_limiter is not None:
+                self.rate_limiter.succeeded()
+            return None
+
+    def send_batch(self, messages):
+        return list(self._executor.map(self._send, messages))
+
+    def set_rate_share(self, share):
+        if self.rate_limiter is not None:
+            self.rate_limiter.set_share(share)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._senders_lock:
+            for sender in self._senders:
+                sender.close()
+            self._senders = []
+
+
+def build_message(subject, html_content, email_address, attachments=()):
+    message = EmailMultiAlternatives(
+        subject=subject,
+        body="",
+        from_email=FROM_EMAIL,
+        to=[email_address],
+    )
+    message.attach_alternative(html_content, "text/html")
+
+    if attachments:
+        # inline images shared by every message of the job; the HTML refers
+        # to them by Content-ID
+        message.mixed_subtype = "related"
+        for attachment in attachments:
+            message.attach(attachment)
+    return message
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def plan_next_job():
+    """Claim the oldest queued job, split it into recipient batches and start it.
+
+    Returns the job, or None when nothing is queued. Batches are ranges of
+    MAILER_LEASE_SIZE recipient ids that any worker can lease; planning
+    happens in the claiming transaction, so workers only ever see a running
+    job together with all of its batches.
+    """
+    with transaction.atomic():
+        job = (
+            SendJob.objects.select_for_update(skip_locked=True)
+            .filter(status=SendJob.STATUS_QUEUED)
+            .order_by("created_at")
+            .first()
+        )
+        if job is None:
+            return None
+
+        # a resumed job is planned again from scratch; the ledger makes sure
+        # recipients already handled are skipped
+        job.batches.all().delete()
+
+        # each keyset page of ids is exactly one batch, so planning never holds
+        # more than MAILER_LEASE_SIZE ids in memory
+        ranges = (
+            (page[0][0], page[-1][0])
+            for page in iter_recipients(
+                job.campaign_id_id, settings.MAILER_LEASE_SIZE, fields=("email_id",)
+            )
+        )
+        for chunk in chunked(ranges, 1000):
+            SendBatch.objects.bulk_create(
+                SendBatch(job_id=job, first_email_id=first, last_email_id=last)
+                for first, last in chunk
+            )
+
+        handled = DeliveryRecord.objects.filter(job_id=job)
+        job.status = SendJob.STATUS_RUNNING
+        job.started_at = timezone.now()
+        # counters restart from what the ledger already knows
+        sent_count = handled.filter(status=DeliveryRecord.STATUS_SENT).count()
+        add_campaign_deliveries(
+            job.campaign_id_id, sent_count - job.sent_count, -job.failed_count
+        )
+        job.sent_count = sent_count
+        job.failed_count = 0
+        job.save(update_fields=["status", "started_at", "sent_count", "failed_count"])
+
+    finish_job_if_done(job)
+    return job
+
+
+def lease_next_batch(worker_id):
+    """Lease the next pending (or abandoned) batch of any running job.
+
+    FOR UPDATE SKIP LOCKED lets any number of workers, on any number of
+    hosts, poll concurrently without ever leasing the same batch twice. A
+    batch whose lease expired (its worker died) is handed out again.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = (
+            SendBatch.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("job_id")
+            .filter(job_id__status=SendJob.STATUS_RUNNING)
+            .filter(
+                Q(status=SendBatch.STATUS_PENDING)
+                | Q(status=SendBatch.STATUS_LEASED, lease_expires_at__lt=now)
+            )
+            .order_by("batch_id")
+            .first()
+        )
+        if batch is None:
+            return None
+
+        batch.status = SendBatch.STATUS_LEASED
+        batch.leased_by = worker_id
+        batch.lease_expires_at = now + timezone.timedelta(
+            seconds=settings.MAILER_LEASE_SECONDS
+        )
+        batch.save(update_fields=["status", "leased_by", "lease_expires_at"])
+    return batch
+
+
+def renew_lease(batch, worker_id):
+    """Extend our lease on a batch.
+
+    False if another worker has taken it over, or the job stopped running
+    (it failed, or its campaign was deleted).
+    """
+    return bool(
+        SendBatch.objects.filter(
+            batch_id=batch.batch_id,
+            status=SendBatch.STATUS_LEASED,
+            leased_by=worker_id,
+            job_id__status=SendJob.STATUS_RUNNING,
+        ).update(
+            lease_expires_at=timezone.now()
+            + timezone.timedelta(seconds=settings.MAILER_LEASE_SECONDS)
+        )
+    )
+
+
+def live_send_workers():
+    """Count the send workers holding an unexpired batch lease."""
+    return (
+        SendBatch.objects.filter(
+            status=SendBatch.STATUS_LEASED, lease_expires_at__gt=timezone.now()
+        )
+        .values("leased_by")
+        .distinct()
+        .count()
+    )
+
+
+def take_rate_share(sender):
+    """Give ``sender`` its share of the send workers' rate limit.
+
+    The limit is divided by the number of workers holding a batch right
+    now, so idle workers take none of it and starting more workers never
+    goes over the provider's limit. Workers re-divide it after every
+    sub-batch.
+    """
+    sender.set_rate_share(1 / max(1, live_send_workers()))
+
+
+def finish_job_if_done(job):
+    """Mark a running job completed once none of its batches are left."""
+    if job.batches.exclude(status=SendBatch.STATUS_DONE).exists():
+        return False
+    return bool(
+        SendJob.objects.filter(job_id=job.job_id, status=SendJob.STATUS_RUNNING).update(
+            status=SendJob.STATUS_COMPLETED, finished_at=timezone.now()
+        )
+    )
+
+
+def fail_job(job, error):
+    SendJob.objects.filter(job_id=job.job_id, status=SendJob.STATUS_RUNNING).update(
+        status=SendJob.STATUS_FAILED, error=str(error), finished_at=timezone.now()
+    )
+
+
+def delivery_record(job, email_id, email_address, error=None, attempts=1):
+    """Build the ledger row for one send attempt.
+
+    Transient failures are scheduled for the retry worker until
+    MAILER_RETRY_MAX_ATTEMPTS is reached, then become dead letters.
+    """
+    now = timezone.now()
+    record = DeliveryRecord(
+        job_id=job,
+        email_id_id=email_id,
+        email_address=email_address,
+        attempts=attempts,
+    )
+
+    if error is None:
+        record.status = DeliveryRecord.STATUS_SENT
+        record.sent_at = now
+        return record
+
+    record.smtp_code = smtp_code(error)
+    record.smtp_response = str(error)[:255]
+
+    if not is_transient(error):
+        record.status = DeliveryRecord.STATUS_FAILED
+    elif attempts >= settings.MAILER_RETRY_MAX_ATTEMPTS:
+        record.status = DeliveryRecord.STATUS_DEAD
+    else:
+        record.status = DeliveryRecord.STATUS_RETRY
+        record.next_attempt_at = now + retry_delay(attempts)
+    return record
+
+
+def add_campaign_deliveries(campaign_id, sent, failed):
+    """Apply a change in a job's sent/failed counters to its campaign's totals."""
+    if sent or failed:
+        Campaign.objects.filter(campaign_id=campaign_id).update(
+            sent_count=F("sent_count") + sent,
+            failed_count=F("failed_count") + failed,
+        )
+        invalidate_campaign_list()
+
+
+def save_delivery_records(job, records):
+    """Write a batch of ledger rows and the job counters in one transaction.
+
+    Rows are upserted in one statement; counters are bumped with F() so the
+    send and retry workers can update the same job concurrently.
+    """
+    sent = sum(1 for record in records if record.status == DeliveryRecord.STATUS_SENT)
+    failed = sum(
+        1
+        for record in records
+        if record.status in (DeliveryRecord.STATUS_FAILED, DeliveryRecord.STATUS_DEAD)
+    )
+
+    with transaction.atomic():
+        DeliveryRecord.objects.bulk_create(
+            records,
+            update_conflicts=True,
+            unique_fields=["job_id", "email_id"],
+            update_fields=[
+                "status",
+                "smtp_code",
+                "smtp_response",
+                "attempts",
+                "next_attempt_at",
+                "sent_at",
+                "updated_at",
+            ],
+        )
+        SendJob.objects.filter(job_id=job.job_id).update(
+            sent_count=F("sent_count") + sent,
+            failed_count=F("failed_count") + failed,
+        )
+        add_campaign_deliveries(job.campaign_id_id, sent, failed)
+
+
+def send_batch(job, template, subject, sender, batch, attempts=None):
+    """Render and send one batch of (email_id, email_address, name) recipients.
+
+    Returns the batch's ledger rows. ``attempts`` maps email_id to the
+    attempt number when re-sending records from the retry queue.
+    """
+    records = []
+    recipients = []
+    messages = []
+
+    for email_id, email_address, name in batch:
+        attempt = attempts[email_id] if attempts else 1
+        try:
+            html_content = template.render(name=name)
+            messages.append(
+                build_message(
+                    subject,
+                    html_content,
+                    email_address,
+                    attachments=template.attachments,
+                )
+            )
+            recipients.append((email_id, email_address, attempt))
+
+        except Exception as e:
+            records.append(delivery_record(job, email_id, email_address, e, attempt))
+
+    for (email_id, email_address, attempt), error in zip(
+        recipients, sender.send_batch(messages)
+    ):
+        records.append(delivery_record(job, email_id, email_address, error, attempt))
+
+    return records
+
+
+def compile_job_template(job):
+    template_name, subject = EMAIL_TEMPLATES[job.email_template]
+    # the message is the same for every recipient, so only the name
+    # is left to fill in per email
+    return CompiledTemplate(template_name, constants={"message": job.message}), subject
+
+
+def cached_job_template(templates, job):
+    """Compile a job's template once per worker, keeping the cache small."""
+    if job.job_id not in templates:
+        if len(templates) >= 32:
+            templates.clear()
+        templates[job.job_id] = compile_job_template(job)
+    return templates[job.job_id]
+
+
+def run_send_batch(batch, worker_id, sender, templates):
+    """Send every recipient in a leased batch not yet handled by this run of the job.
+
+    The lease is renewed after each sub-batch of MAILER_BATCH_SIZE; if it
+    was lost (we stalled past the lease and another worker took over) we
+    stop and leave the rest to that worker. ``templates`` caches compiled
+    templates per job across batches.
+    """
+    job = batch.job_id
+    # sent and queued-for-retry recipients are done for good; failed and dead
+    # ones are tried again by a resume, so they only count once this run has
+    # written them (a batch leased again after its lease expired must not
+    # send them, or count them, twice)
+    handled = DeliveryRecord.objects.filter(job_id=job).filter(
+        Q(status__in=[DeliveryRecord.STATUS_SENT, DeliveryRecord.STATUS_RETRY])
+        | Q(updated_at__gte=job.started_at)
+    )
+
+    try:
+        template, subject = cached_job_template(templates, job)
+        take_rate_share(sender)
+
+        for sub_batch in iter_recipients(
+            job.campaign_id_id,
+            settings.MAILER_BATCH_SIZE,
+            first_email_id=batch.first_email_id,
+            last_email_id=batch.last_email_id,
+        ):
+            already_handled = set(
+                handled.filter(
+                    email_id__in=[email_id for email_id, _, _ in sub_batch]
+                ).values_list("email_id", flat=True)
+            )
+            sub_batch = [
+                recipient for recipient in sub_batch if recipient[0] not in already_handled
+            ]
+            if sub_batch:
+                save_delivery_records(
+                    job, send_batch(job, template, subject, sender, sub_batch)
+                )
+
+            if not renew_lease(batch, worker_id):
+                return False
+            take_rate_share(sender)
+
+    except Exception as e:
+        fail_job(job, e)
+        return False
+
+    SendBatch.objects.filter(batch_id=batch.batch_id, leased_by=worker_id).update(
+        status=SendBatch.STATUS_DONE, lease_expires_at=None
+    )
+    finish_job_if_done(job)
+    return True
+
+
+def resume_job(job):
+    """Queue a finished or failed job to send its remaining recipients."""
+    job.status = SendJob.STATUS_QUEUED
+    job.error = ""
+    job.finished_at = None
+    job.save(update_fields=["status", "error", "finished_at"])
+    return job
@@ -1,5 +1,7 @@
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Email, Campaign
+from .models import Email, Campaign, SendJob, DeliveryRecord, ImportJob, ImportRowOutcome
+from .validation import ERROR_MESSAGES
 
 class EmailSerializer(serializers.ModelSerializer):
     class Meta:
@@ -10,4 +12,58 @@ class EmailSerializer(serializers.ModelSerializer):
 class CampaignSerializer(serializers.ModelSerializer):
     class Meta:
         model = Campaign
-        fields = ['campaign_id', 'campaign_name', 'created_at', 'updated_at']
\ No newline at end of file
+        fields = ['campaign_id', 'campaign_name', 'recipient_count', 'sent_count', 'failed_count', 'created_at', 'updated_at']
+        read_only_fields = ['recipient_count', 'sent_count', 'failed_count']
+
+class SendJobSerializer(serializers.ModelSerializer):
+    details = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SendJob
+        fields = ['job_id', 'campaign_id', 'email_template', 'status', 'details', 'error', 'created_at', 'started_at', 'finished_at']
+
+    def get_details(self, obj):
+        return {
+            "sent": obj.sent_count,
+            "failed": obj.failed_count,
+            "retrying": obj.deliveries.filter(status=DeliveryRecord.STATUS_RETRY).count(),
+        }
+
+
+class DeliveryRecordSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DeliveryRecord
+        fields = ['record_id', 'job_id', 'email_id', 'email_address', 'status', 'smtp_code', 'smtp_response', 'attempts', 'next_attempt_at', 'sent_at', 'updated_at']
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    details = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportJob
+        fields = ['job_id', 'campaign_id', 'file_name', 'ingest', 'all_sheets', 'status', 'details', 'error', 'created_at', 'started_at', 'finished_at']
+
+    def get_details(self, obj):
+        rows_per_second = None
+        if obj.started_at:
+            elapsed = ((obj.finished_at or timezone.now()) - obj.started_at).total_seconds()
+            if elapsed > 0:
+                rows_per_second = round(obj.rows_processed / elapsed, 1)
+        return {
+            "rows": obj.rows_processed,
+            "inserted": obj.inserted_count,
+            "duplicates": obj.duplicate_count,
+            "invalid": obj.invalid_count,
+            "rows_per_second": rows_per_second,
+        }
+
+
+class ImportRowOutcomeSerializer(serializers.ModelSerializer):
+    error = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportRowOutcome
+        fields = ['outcome_id', 'source', 'row_number', 'outcome', 'email_address', 'error']
+
+    def get_error(self, obj):
+        return ERROR_MESSAGES.get(obj.error, "")
@@ -1,3 +1,1380 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import smtplib
+import socketserver
+import tempfile
+import threading
+import zipfile
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import openpyxl
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template.loader import get_template, render_to_string
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .importer import (
+    ImportLeaseLost,
+    ImportResult,
+    claim_next_import,
+    copy_rows,
+    detect_encoding,
+    import_rows,
+    iter_csv_rows,
+    iter_recipient_list,
+    iter_xlsx_rows,
+    run_import,
+    save_import_progress,
+    split_recipient_list,
+)
+from .models import (
+    Campaign,
+    DeliveryRecord,
+    Email,
+    ImportJob,
+    ImportRowOutcome,
+    SendBatch,
+    SendJob,
+)
+from .purging import next_campaign_to_purge, purge_campaign
+from .recipients import iter_recipients
+from .retries import replay_dead_letters
+from .rendering import CompiledTemplate, extract_inline_images
+from .sending import (
+    EMAIL_TEMPLATES,
+    BatchSender,
+    RateLimiter,
+    SenderPool,
+    build_message,
+    delivery_record,
+    is_transient,
+    lease_next_batch,
+    plan_next_job,
+    renew_lease,
+    resume_job,
+    retry_delay,
+    run_send_batch,
+)
+from .validation import (
+    ERROR_DOMAIN,
+    ERROR_LENGTH,
+    ERROR_MISSING,
+    ERROR_SYNTAX,
+    normalize_email,
+    validate_rows,
+)
+
+RECIPIENTS = 50
+
+# query counts are pinned for the views' own queries, not the cache backend's
+LOCAL_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def add_recipients(campaign, count=RECIPIENTS):
+    import_rows(
+        campaign,
+        ((row + 2, f"Recipient {row}", f"recipient{row}@example.com") for row in range(count)),
+    )
+
+
+@override_settings(ALLOWED_HOSTS=["*"], CACHES=LOCAL_CACHE)
+class EndpointQueryCountTests(TestCase):
+    """Each endpoint runs a fixed number of queries, whatever the campaign size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.campaign = Campaign.objects.create(campaign_name="Query counts")
+        add_recipients(cls.campaign)
+        cls.job = SendJob.objects.create(campaign_id=cls.campaign, email_template="1", message="")
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_campaign_list(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/email/campaigns/")
+        self.assertEqual(response.status_code, 200)
+
+        # cached body, then a conditional GET
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/email/campaigns/").status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                "/email/campaigns/", HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_emails_page(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                f"/email/list-emails/?campaign_id={self.campaign.campaign_id}&page_size=20"
+            )
+        self.assertEqual(len(response.json()["results"]), 20)
+        self.assertIsNotNone(response.json()["next_cursor"])
+
+    def test_list_emails_export(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                f"/email/list-emails/?campaign_id={self.campaign.campaign_id}&export=ndjson"
+            )
+            lines = b"".join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), RECIPIENTS)
+
+    def test_delete_email(self):
+        # lookup, then delete and recipient counter in a transaction (a
+        # savepoint and its release inside the test's own transaction)
+        with self.assertNumQueries(5):
+            response = self.client.post(
+                f"/email/delete-email?email_add=RECIPIENT7@example.com"
+                f"&campaign_id={self.campaign.campaign_id}"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.recipient_count, RECIPIENTS - 1)
+
+    def test_bulk_delete_emails(self):
+        addresses = [f"RECIPIENT{row}@example.com" for row in range(30)]
+        # campaign check, then per batch a delete and a counter update in a
+        # savepoint
+        with self.assertNumQueries(5):
+            response = self.client.post(
+                f"/email/bulk-delete-emails?campaign_id={self.campaign.campaign_id}",
+                {"email_addresses": addresses + ["missing@example.com"]},
+                format="json",
+            )
+        self.assertEqual(response.json()["deleted"], 30)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.recipient_count, RECIPIENTS - 30)
+
+    def test_send_emails(self):
+        with self.assertNumQueries(3):
+            response = self.client.post(
+                f"/email/send-emails/?campaign_id={self.campaign.campaign_id}&email_template=1"
+            )
+        self.assertEqual(response.status_code, 202)
+
+    def test_send_job_status(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/email/send-job-status?job_id={self.job.job_id}")
+        self.assertEqual(response.status_code, 200)
+
+    def test_upload(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        upload = SimpleUploadedFile("list.csv", b"name,email\nA,a@example.com\n")
+
+        with override_settings(MEDIA_ROOT=media_root), self.assertNumQueries(6):
+            response = self.client.post(
+                f"/email/upload-xls/?campaign_id={self.campaign.campaign_id}",
+                {"file": upload},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 202)
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class CampaignListCacheTests(TestCase):
+    """The campaign list cache, on the shared backend the workers also write to."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.campaign = Campaign.objects.create(campaign_name="Cached")
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_poll_queries(self):
+        # on the DatabaseCache default every cache read is a query of its
+        # own; an in-memory shared cache such as Redis makes polls query-free
+        cache_reads = 1 if isinstance(caches["default"], DatabaseCache) else 0
+        etag = self.client.get("/email/campaigns/")["ETag"]
+
+        # version and body
+        with self.assertNumQueries(2 * cache_reads):
+            self.assertEqual(self.client.get("/email/campaigns/").status_code, 200)
+        # version only
+        with self.assertNumQueries(cache_reads):
+            response = self.client.get("/email/campaigns/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_invalidated_by_writes(self):
+        etag = self.client.get("/email/campaigns/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/email/campaigns/create", {"campaign_name": "New"}, format="json"
+            )
+        response = self.client.get("/email/campaigns/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("New", [campaign["campaign_name"] for campaign in response.json()])
+
+    def test_invalidated_by_counter_updates(self):
+        etag = self.client.get("/email/campaigns/")["ETag"]
+        # as import and send workers do, from their own processes
+        with self.captureOnCommitCallbacks(execute=True):
+            add_recipients(self.campaign, 3)
+        response = self.client.get("/email/campaigns/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["recipient_count"], 3)
+
+
+@override_settings(ALLOWED_HOSTS=["*"], CACHES=LOCAL_CACHE)
+class CampaignDeletionTests(TestCase):
+    """Deleted campaigns vanish at once and are purged later in chunks."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.campaign = Campaign.objects.create(campaign_name="Deleted")
+        add_recipients(cls.campaign)
+        cls.job = SendJob.objects.create(campaign_id=cls.campaign, email_template="1", message="")
+        email = cls.campaign.emails.order_by("email_id").first()
+        DeliveryRecord.objects.create(
+            job_id=cls.job,
+            email_id=email,
+            email_address=email.email_address,
+            status=DeliveryRecord.STATUS_SENT,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                f"/email/delete-campaign?campaign_id={self.campaign.campaign_id}"
+            )
+
+    def test_deleted_campaign_is_hidden(self):
+        # updates of the campaign and both job tables, in a savepoint
+        with self.assertNumQueries(5):
+            response = self.delete()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Email.objects.filter(campaign_id=self.campaign).count(), RECIPIENTS)
+
+        self.assertEqual(self.client.get("/email/campaigns/").json(), [])
+        for url in (
+            f"/email/list-emails/?campaign_id={self.campaign.campaign_id}",
+            f"/email/send-job-status?job_id={self.job.job_id}",
+        ):
+            self.assertEqual(self.client.get(url).status_code, 404, url)
+        self.assertEqual(self.delete().status_code, 404)
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, SendJob.STATUS_FAILED)
+
+        # the name is free again before the purge
+        response = self.client.post(
+            "/email/campaigns/create", {"campaign_name": "Deleted"}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_purge(self):
+        self.delete()
+        campaign = next_campaign_to_purge()
+        self.assertEqual(campaign.campaign_id, self.campaign.campaign_id)
+
+        # a batch still leased by a send worker holds the purge back
+        batch = SendBatch.objects.create(
+            job_id=self.job,
+            first_email_id=0,
+            last_email_id=0,
+            status=SendBatch.STATUS_LEASED,
+            lease_expires_at=timezone.now() + timezone.timedelta(minutes=5),
+        )
+        self.assertIsNone(next_campaign_to_purge())
+        batch.lease_expires_at = timezone.now()
+        batch.save()
+
+        # recipients, delivery, batch, then campaign and job
+        self.assertEqual(purge_campaign(campaign, batch_size=20), RECIPIENTS + 4)
+        self.assertFalse(Campaign.all_objects.filter(pk=self.campaign.pk).exists())
+        self.assertFalse(Email.objects.filter(campaign_id=self.campaign.pk).exists())
+        self.assertIsNone(next_campaign_to_purge())
+
+
+@skipUnless(connection.vendor == "postgresql", "index checks need PostgreSQL")
+@override_settings(ALLOWED_HOSTS=["*"])
+class EmailIndexUsageTests(TestCase):
+    """The mailer_email queries behind each endpoint must be able to use an index.
+
+    Test tables are tiny, so sequential and bitmap scans are switched off to
+    make the planner show the plan it would pick for a large table: with no
+    usable index it still has to fall back to a sequential scan, and a read
+    whose order no index provides still needs a Sort.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.campaign = Campaign.objects.create(campaign_name="Indexes")
+        add_recipients(cls.campaign)
+        # the campaign is a small slice of the table, as in production
+        add_recipients(Campaign.objects.create(campaign_name="Other campaign"), 5000)
+        # plan from the test rows rather than whatever statistics the table has
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE mailer_email")
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def email_plans(self, run):
+        """EXPLAIN every query and delete on mailer_email that ``run`` executes."""
+        with CaptureQueriesContext(connection) as queries:
+            run()
+
+        plans = []
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_bitmapscan = off")
+            for query in queries:
+                sql = query["sql"]
+                if sql.startswith(("SELECT", "DELETE")) and 'FROM "mailer_email"' in sql:
+                    cursor.execute(f"EXPLAIN {sql}")
+                    plans.append((sql, "\n".join(row[0] for row in cursor.fetchall())))
+        self.assertTrue(plans, "no query on mailer_email was run")
+        return plans
+
+    def assertUsesIndex(self, run, index, sorted=True):
+        plans = self.email_plans(run)
+        for sql, plan in plans:
+            self.assertNotIn("Seq Scan", plan, sql)
+            if sorted:
+                # keyset reads get their order from the index
+                self.assertNotIn("Sort", plan, sql)
+        self.assertIn(index, "\n".join(plan for sql, plan in plans))
+
+    def test_list_emails_page(self):
+        self.assertUsesIndex(
+            lambda: self.client.get(
+                f"/email/list-emails/?campaign_id={self.campaign.campaign_id}"
+                f"&cursor=1&page_size=10"
+            ),
+            "email_campaign_idx",
+        )
+
+    def test_list_emails_export(self):
+        self.assertUsesIndex(
+            lambda: b"".join(
+                self.client.get(
+                    f"/email/list-emails/?campaign_id={self.campaign.campaign_id}&export=csv"
+                ).streaming_content
+            ),
+            "email_campaign_idx",
+        )
+
+    def test_send_batch_recipients(self):
+        first = self.campaign.emails.order_by("email_id").values_list("email_id", flat=True)[10]
+        self.assertUsesIndex(
+            lambda: list(
+                iter_recipients(
+                    self.campaign.campaign_id, 10, first_email_id=first, last_email_id=first + 20
+                )
+            ),
+            "email_campaign_idx",
+        )
+
+    def test_send_emails(self):
+        self.assertUsesIndex(
+            lambda: self.client.post(
+                f"/email/send-emails/?campaign_id={self.campaign.campaign_id}&email_template=1"
+            ),
+            "email_campaign_idx",
+            sorted=False,
+        )
+
+    def test_delete_email(self):
+        self.assertUsesIndex(
+            lambda: self.client.post(
+                f"/email/delete-email?email_add=recipient7@example.com"
+                f"&campaign_id={self.campaign.campaign_id}"
+            ),
+            "email_campaign_address_uniq",
+            sorted=False,
+        )
+
+    def test_bulk_delete_emails(self):
+        self.assertUsesIndex(
+            lambda: self.client.post(
+                f"/email/bulk-delete-emails?campaign_id={self.campaign.campaign_id}",
+                {"email_addresses": ["Recipient7@example.com"]},
+                format="json",
+            ),
+            "email_campaign_address_uniq",
+            sorted=False,
+        )
+
+
+class ImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.campaign = Campaign.objects.create(campaign_name="Imports")
+
+    def test_duplicates_are_counted_from_returning(self):
+        add_recipients(self.campaign, 3)
+        job = ImportJob.objects.create(campaign_id=self.campaign, file_name="list.xlsx")
+        rows = [
+            (2, "New", "new@example.com"),
+            (3, "Existing", "RECIPIENT1@example.com"),
+            (4, "Repeat", "New@Example.com"),
+            (5, "Other", "other@example.com"),
+        ]
+
+        # batches smaller than the upload: repeats span batches too
+        result = import_rows(self.campaign, rows, batch_size=2, job=job)
+
+        self.assertEqual((result.inserted, result.duplicates), (2, 2))
+        self.assertEqual(
+            list(job.outcomes.order_by("row_number").values_list("row_number", "outcome")),
+            [(3, "duplicate"), (4, "duplicate")],
+        )
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.recipient_count, 5)
+        self.assertEqual(self.campaign.emails.count(), 5)
+
+    @skipUnless(connection.vendor == "postgresql", "COPY needs PostgreSQL")
+    def test_copy_keeps_file_order(self):
+        job = ImportJob.objects.create(
+            campaign_id=self.campaign, file_name="list.csv", ingest=ImportJob.INGEST_COPY
+        )
+        addresses = ["zed@example.com", "amy@example.com", "Mia@example.com", "bo@example.com"]
+
+        rows = [(row + 2, "", address) for row, address in enumerate(addresses)]
+        copy_rows(self.campaign, rows, job)
+
+        self.assertEqual(
+            list(self.campaign.emails.order_by("email_id").values_list("email_address", flat=True)),
+            addresses,
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "COPY needs PostgreSQL")
+    def test_copy_reports_many_rejected_rows(self):
+        job = ImportJob.objects.create(
+            campaign_id=self.campaign, file_name="list.csv", ingest=ImportJob.INGEST_COPY
+        )
+        # more rejected rows than one outcome batch, interleaved with the valid ones
+        rows = [
+            (row + 2, "", f"r{row}@example.com" if row % 2 else "not an address")
+            for row in range(3000)
+        ]
+        rows.append((3002, "", "R1@example.com"))
+
+        result = copy_rows(self.campaign, rows, job)
+
+        self.assertEqual(
+            (result.rows, result.inserted, result.invalid, result.duplicates),
+            (3001, 1500, 1500, 1),
+        )
+        self.assertEqual(job.outcomes.filter(outcome="invalid").count(), 1500)
+        self.assertEqual(job.outcomes.get(outcome="duplicate").row_number, 3002)
+
+
+@override_settings(MAILER_IMPORT_LEASE_SECONDS=60)
+class ImportJobLeaseTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.campaign = Campaign.objects.create(campaign_name="Import leases")
+
+    def setUp(self):
+        self.job = ImportJob.objects.create(campaign_id=self.campaign, file_name="list.csv")
+
+    def expire_lease(self):
+        ImportJob.objects.filter(job_id=self.job.job_id).update(
+            lease_expires_at=timezone.now() - timezone.timedelta(seconds=1)
+        )
+
+    def test_job_of_a_dead_worker_is_claimed_again(self):
+        first = claim_next_import("worker-1")
+        self.assertEqual(first, self.job)
+        self.assertEqual(first.leased_by, "worker-1")
+        self.assertIsNone(claim_next_import("worker-2"))
+
+        result = ImportResult(first)
+        result.rows = 3
+        result.add_invalid("list.csv", 2, "nobody", ERROR_SYNTAX)
+        result.save_outcomes()
+        save_import_progress(first, result)
+
+        # worker-1 dies: its job goes to the next worker that asks, from scratch
+        self.expire_lease()
+        second = claim_next_import("worker-2")
+        self.assertEqual(second, self.job)
+        self.assertEqual((second.leased_by, second.rows_processed), ("worker-2", 0))
+        self.assertFalse(second.outcomes.exists())
+        with self.assertRaises(ImportLeaseLost):
+            save_import_progress(first, result)
+
+    def test_deleted_campaign_waits_only_for_a_live_lease(self):
+        claim_next_import("worker-1")
+        self.campaign.deleted_at = timezone.now()
+        self.campaign.save(update_fields=["deleted_at"])
+        self.assertIsNone(next_campaign_to_purge())
+
+        self.expire_lease()
+        self.assertEqual(next_campaign_to_purge(), self.campaign)
+        self.assertIsNone(claim_next_import("worker-2"))
+
+
+@override_settings(ALLOWED_HOSTS=["*"])
+class ImportEndpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.campaign = Campaign.objects.create(campaign_name="Uploads")
+
+    def setUp(self):
+        self.client = APIClient()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def upload(self, content, query=""):
+        return self.client.post(
+            f"/email/upload-xls/?campaign_id={self.campaign.campaign_id}{query}",
+            {"file": SimpleUploadedFile("list.csv", content)},
+            format="multipart",
+        )
+
+    def test_identical_upload_returns_the_earlier_job(self):
+        content = b"name,email\nA,a@example.com\n"
+        first = self.upload(content)
+        self.assertEqual(first.status_code, 202)
+
+        again = self.upload(content)
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.data["job_id"], first.data["job_id"])
+        self.assertEqual(
+            again.data["message"], "This file was already uploaded to this campaign."
+        )
+
+        forced = self.upload(content, "&force=true")
+        self.assertEqual(forced.status_code, 202)
+        self.assertNotEqual(forced.data["job_id"], first.data["job_id"])
+
+        # a failed import does not block uploading the file again
+        ImportJob.objects.filter(campaign_id=self.campaign).update(
+            status=ImportJob.STATUS_FAILED
+        )
+        self.assertEqual(self.upload(content).status_code, 202)
+        self.assertEqual(self.upload(b"name,email\nB,b@example.com\n").status_code, 202)
+
+    def add_outcomes(self, job):
+        ImportRowOutcome.objects.bulk_create(
+            ImportRowOutcome(
+                job_id=job,
+                source="list.csv",
+                row_number=row,
+                outcome="invalid" if row % 2 else "duplicate",
+                email_address=f"r{row}@example" if row % 2 else f"r{row}@example.com",
+                error=ERROR_DOMAIN if row % 2 else "",
+            )
+            for row in range(2, 12)
+        )
+
+    def test_import_report_pages(self):
+        job = ImportJob.objects.create(campaign_id=self.campaign, file_name="list.csv")
+        self.add_outcomes(job)
+        url = f"/email/import-report/?job_id={job.job_id}"
+
+        with mock.patch("mailer.views.IMPORT_REPORT_PAGE_SIZE", 3):
+            first = self.client.get(url + "&outcome=invalid")
+            rest = self.client.get(url + f"&outcome=invalid&after={first.data['next']}")
+        self.assertEqual(
+            [row["row_number"] for row in first.data["results"]], [3, 5, 7]
+        )
+        self.assertEqual([row["row_number"] for row in rest.data["results"]], [9, 11])
+        self.assertIsNone(rest.data["next"])
+        self.assertEqual(first.data["results"][0]["error"], "Invalid email domain.")
+
+        everything = self.client.get(url)
+        self.assertEqual(len(everything.data["results"]), 10)
+        self.assertIsNone(everything.data["next"])
+
+        self.assertEqual(self.client.get("/email/import-report/").status_code, 400)
+        self.assertEqual(
+            self.client.get("/email/import-report/?job_id=x").status_code, 400
+        )
+        self.assertEqual(
+            self.client.get("/email/import-report/?job_id=0").status_code, 404
+        )
+        self.campaign.deleted_at = timezone.now()
+        self.campaign.save(update_fields=["deleted_at"])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_import_report_csv(self):
+        job = ImportJob.objects.create(campaign_id=self.campaign, file_name="list.csv")
+        self.add_outcomes(job)
+
+        response = self.client.get(f"/email/import-report.csv?job_id={job.job_id}")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "source,row,outcome,email_address,error")
+        self.assertEqual(lines[1], "list.csv,2,duplicate,r2@example.com,")
+        self.assertEqual(lines[2], "list.csv,3,invalid,r3@example,Invalid email domain.")
+        self.assertEqual(len(lines), 11)
+        self.assertEqual(
+            self.client.get("/email/import-report.csv?job_id=0").status_code, 404
+        )
+
+    def test_import_job_status(self):
+        job = ImportJob.objects.create(
+            campaign_id=self.campaign,
+            file_name="list.csv",
+            status=ImportJob.STATUS_COMPLETED,
+            rows_processed=12,
+            inserted_count=8,
+            duplicate_count=3,
+            invalid_count=1,
+        )
+
+        response = self.client.get(f"/email/import-job-status?job_id={job.job_id}")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], ImportJob.STATUS_COMPLETED)
+        self.assertEqual(
+            response.data["details"],
+            {"rows": 12, "inserted": 8, "duplicates": 3, "invalid": 1, "rows_per_second": None},
+        )
+        self.assertEqual(
+            self.client.get("/email/import-job-status?job_id=0").status_code, 404
+        )
+
+
+def workbook(sheets):
+    """An .xlsx file holding ``sheets``, a dict of sheet name to rows."""
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for name, rows in sheets.items():
+        sheet = wb.create_sheet(name)
+        for row in rows:
+            sheet.append(row)
+    out = io.BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+def zip_bundle(members):
+    """A .zip file holding ``members``, a dict of member name to bytes."""
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w") as bundle:
+        for name, content in members.items():
+            bundle.writestr(name, content)
+    return out.getvalue()
+
+
+# the parse workers are forked after the database connections are closed,
+# which the transaction a TestCase runs in would not survive
+@override_settings(ALLOWED_HOSTS=["*"], MAILER_IMPORT_PROCESSES=4)
+class ImportWorkerTests(TransactionTestCase):
+    def setUp(self):
+        self.campaign = Campaign.objects.create(campaign_name="Bulk import")
+        self.client = APIClient()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def import_files(self, files, query=""):
+        """Upload ``files`` (name to bytes) and run the job as import_worker does."""
+        response = self.client.post(
+            f"/email/upload-xls/?campaign_id={self.campaign.campaign_id}{query}",
+            {"file": [SimpleUploadedFile(name, content) for name, content in files.items()]},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 202)
+        job = claim_next_import("worker-1")
+        self.assertEqual(job.job_id, response.data["job_id"])
+        run_import(job)
+        job.refresh_from_db()
+        # the spooled uploads are gone, whatever the outcome
+        self.assertEqual(os.listdir(os.path.join(self.media_root, "imports")), [])
+        return job
+
+    def test_bundle_and_all_sheets(self):
+        people = workbook(
+            {
+                "First": [("Name", "Email"), ("Ann", "ann@example.com"), ("Bob", "not an address")],
+                "Second": [("Name", "Email"), ("Cat", "cat@example.com"), ("Ann", "ANN@example.com")],
+            }
+        )
+        more = b"name,email\nDan,dan@example.com\nEve,eve@example.com\n"
+        bundle = zip_bundle(
+            {
+                "lists/more.csv": more,
+                # macOS metadata, hidden files and other formats are skipped
+                "__MACOSX/lists/._more.csv": b"name,email\nMac,mac@example.com\n",
+                "lists/.hidden.csv": b"name,email\nHid,hidden@example.com\n",
+                "lists/readme.txt": b"name,email\nTxt,txt@example.com\n",
+            }
+        )
+
+        job = self.import_files(
+            {"people.xlsx": people, "bundle.zip": bundle}, "&all_sheets=true"
+        )
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED, job.error)
+        self.assertEqual(
+            (job.rows_processed, job.inserted_count, job.duplicate_count, job.invalid_count),
+            (6, 4, 1, 1),
+        )
+        self.assertCountEqual(
+            [address.lower() for address in self.campaign.emails.values_list("email_address", flat=True)],
+            ["ann@example.com", "cat@example.com", "dan@example.com", "eve@example.com"],
+        )
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.recipient_count, 4)
+
+        invalid = job.outcomes.get(outcome=ImportRowOutcome.OUTCOME_INVALID)
+        self.assertEqual(
+            (invalid.source, invalid.row_number, invalid.email_address),
+            ("people.xlsx!First", 3, "not an address"),
+        )
+        # the two sheets are parsed in parallel, so either Ann may come first
+        duplicate = job.outcomes.get(outcome=ImportRowOutcome.OUTCOME_DUPLICATE)
+        self.assertIn(
+            (duplicate.source, duplicate.row_number),
+            [("people.xlsx!First", 2), ("people.xlsx!Second", 3)],
+        )
+
+    def test_parse_error_in_a_worker_fails_the_job(self):
+        job = self.import_files(
+            {
+                "broken.xlsx": b"not a workbook",
+                "good.csv": b"name,email\nAnn,ann@example.com\n",
+            }
+        )
+
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertEqual(job.error, "Invalid Excel or zip file. Please upload valid files.")
+        self.assertFalse(self.campaign.emails.exists())
+
+
+class RateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("mailer.sending.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_refills_at_the_rate_up_to_the_burst(self):
+        limiter = RateLimiter(rate=10, burst=5)
+        for _ in range(5):
+            limiter.acquire()
+        self.assertLess(limiter.tokens, 1)
+
+        self.now += 0.2
+        limiter._refill(self.now)
+        self.assertAlmostEqual(limiter.tokens, 2)
+
+        self.now += 10
+        limiter._refill(self.now)
+        self.assertAlmostEqual(limiter.tokens, 5)
+
+    def test_throttling_halves_the_rate_once_per_episode(self):
+        limiter = RateLimiter(rate=8, min_rate=1, recovery_seconds=30)
+        limiter.throttled()
+        self.assertEqual(limiter.rate, 4)
+        # everyone pauses: the bucket is a full capacity in debt
+        self.assertEqual(limiter.tokens, -limiter.capacity)
+
+        self.now += 0.5
+        limiter.throttled()
+        self.assertEqual(limiter.rate, 4)
+
+        for _ in range(5):
+            self.now += 1
+            limiter.throttled()
+        self.assertEqual(limiter.rate, 1)
+
+    def test_recovers_after_a_quiet_period(self):
+        limiter = RateLimiter(rate=10, recovery_seconds=30)
+        limiter.throttled()
+        self.now += 10
+        limiter.succeeded()
+        self.assertEqual(limiter.rate, 5)
+
+        self.now += 30
+        limiter.succeeded()
+        self.assertEqual(limiter.rate, 6)
+
+    @override_settings(
+        MAILER_RATE_LIMIT=20.0,
+        MAILER_RATE_BURST=10,
+        MAILER_RATE_MIN=1.0,
+        MAILER_RETRY_RATE_LIMIT=2.0,
+    )
+    def test_retry_worker_has_its_own_share(self):
+        send = RateLimiter.from_settings()
+        retries = RateLimiter.from_settings(retries=True)
+        self.assertEqual((send.rate, send.max_burst, send.min_rate), (18.0, 9.0, 0.9))
+        self.assertAlmostEqual(retries.rate, 2.0)
+        self.assertAlmostEqual(retries.min_rate, 0.1)
+
+        # never more than half the account
+        with self.settings(MAILER_RETRY_RATE_LIMIT=50.0):
+            self.assertEqual(RateLimiter.from_settings(retries=True).rate, 10.0)
+
+    def test_share_keeps_the_backoff(self):
+        limiter = RateLimiter(rate=12, burst=6, min_rate=3)
+        limiter.throttled()
+        self.assertEqual(limiter.rate, 6)
+
+        limiter.set_share(1 / 3)
+        self.assertEqual(
+            (limiter.rate, limiter.max_rate, limiter.max_burst, limiter.min_rate),
+            (2.0, 4.0, 2.0, 1.0),
+        )
+        self.assertLessEqual(limiter.tokens, limiter.capacity)
+
+        limiter.set_share(1)
+        self.assertEqual((limiter.rate, limiter.max_rate), (6.0, 12.0))
+
+    @override_settings(MAILER_RATE_LIMIT=0)
+    def test_unlimited(self):
+        self.assertIsNone(RateLimiter.from_settings())
+
+
+@override_settings(
+    MAILER_RETRY_MAX_ATTEMPTS=3, MAILER_RETRY_BASE_SECONDS=60.0, MAILER_RETRY_MAX_SECONDS=600.0
+)
+class RetryTests(SimpleTestCase):
+    def test_transient_and_permanent_errors(self):
+        transient = [
+            smtplib.SMTPResponseException(421, b"Try again later"),
+            smtplib.SMTPRecipientsRefused({"a@example.com": (450, b"Mailbox busy")}),
+            smtplib.SMTPServerDisconnected(),
+            ConnectionRefusedError(),
+        ]
+        permanent = [
+            smtplib.SMTPResponseException(550, b"No such user"),
+            smtplib.SMTPRecipientsRefused({"a@example.com": (553, b"Bad address")}),
+            smtplib.SMTPException("Protocol error"),
+            ValueError("Rendering failed"),
+        ]
+        for error in transient:
+            self.assertTrue(is_transient(error), repr(error))
+        for error in permanent:
+            self.assertFalse(is_transient(error), repr(error))
+
+    def test_retry_delay_backs_off_with_jitter_up_to_the_cap(self):
+        for attempts, delay in ((1, 60), (2, 120), (3, 240), (10, 600)):
+            for _ in range(20):
+                seconds = retry_delay(attempts).total_seconds()
+                self.assertTrue(delay / 2 <= seconds <= delay, (attempts, seconds))
+
+    def test_delivery_record_status(self):
+        job = SendJob(job_id=1)
+        busy = smtplib.SMTPResponseException(451, b"Busy")
+
+        record = delivery_record(job, 1, "a@example.com", busy, attempts=1)
+        self.assertEqual((record.status, record.smtp_code), (DeliveryRecord.STATUS_RETRY, 451))
+        self.assertGreater(record.next_attempt_at, timezone.now())
+
+        record = delivery_record(job, 1, "a@example.com", busy, attempts=3)
+        self.assertEqual(record.status, DeliveryRecord.STATUS_DEAD)
+
+        record = delivery_record(
+            job, 1, "a@example.com", smtplib.SMTPResponseException(550, b"No such user")
+        )
+        self.assertEqual(record.status, DeliveryRecord.STATUS_FAILED)
+        self.assertIsNone(record.next_attempt_at)
+
+        self.assertEqual(
+            delivery_record(job, 1, "a@example.com").status, DeliveryRecord.STATUS_SENT
+        )
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """A minimal SMTP server on localhost that keeps every message it accepts.
+
+    With ``drop_after``, each connection is dropped when the client starts
+    another message after that many, as providers do at their per-connection
+    limit.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, drop_after=None):
+        super().__init__(("127.0.0.1", 0), SmtpSinkHandler)
+        self.drop_after = drop_after
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.recipients = []
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+class SmtpSinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+        self.reply("220 sink")
+        accepted = 0
+        recipients = []
+        for line in self.rfile:
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb == "EHLO":
+                self.reply("250 sink")
+            elif verb == "MAIL" and accepted == self.server.drop_after:
+                return
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[1].strip(" <>"))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                for data in self.rfile:
+                    if data == b".\r\n":
+                        break
+                with self.server.lock:
+                    self.server.recipients.extend(recipients)
+                accepted += 1
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class SmtpSinkTestCase(SimpleTestCase):
+    drop_after = None
+
+    def setUp(self):
+        self.sink = SmtpSink(self.drop_after)
+        threading.Thread(target=self.sink.serve_forever, args=(0.05,), daemon=True).start()
+        self.addCleanup(self.sink.server_close)
+        self.addCleanup(self.sink.shutdown)
+        self.connection_kwargs = {
+            "backend": "django.core.mail.backends.smtp.EmailBackend",
+            "host": "127.0.0.1",
+            "port": self.sink.port,
+            "username": "",
+            "password": "",
+            "use_tls": False,
+            "use_ssl": False,
+        }
+
+    def messages(self, count):
+        addresses = [f"recipient{row}@example.com" for row in range(count)]
+        return addresses, [build_message("Hello", "<p>Hello</p>", address) for address in addresses]
+
+
+class SenderPoolTests(SmtpSinkTestCase):
+    def test_sends_over_one_connection_per_worker(self):
+        addresses, messages = self.messages(20)
+
+        with SenderPool(
+            workers=2, connection_kwargs=self.connection_kwargs, rate_limiter=None
+        ) as pool:
+            results = pool.send_batch(messages)
+
+        self.assertEqual(results, [None] * len(messages))
+        self.assertCountEqual(self.sink.recipients, addresses)
+        self.assertLessEqual(self.sink.connections, 2)
+
+
+class BatchSenderTests(SmtpSinkTestCase):
+    def test_recycles_the_connection(self):
+        addresses, messages = self.messages(7)
+
+        with BatchSender(
+            max_messages_per_connection=3, connection_kwargs=self.connection_kwargs
+        ) as sender:
+            results = sender.send_batch(messages)
+
+        self.assertEqual(results, [None] * 7)
+        self.assertEqual(self.sink.recipients, addresses)
+        self.assertEqual(self.sink.connections, 3)
+
+
+class BatchSenderReconnectTests(SmtpSinkTestCase):
+    drop_after = 2
+
+    def test_reconnects_when_the_server_hangs_up(self):
+        addresses, messages = self.messages(5)
+
+        with BatchSender(
+            max_messages_per_connection=100, connection_kwargs=self.connection_kwargs
+        ) as sender:
+            results = sender.send_batch(messages)
+
+        self.assertEqual(results, [None] * 5)
+        self.assertEqual(self.sink.recipients, addresses)
+        self.assertEqual(self.sink.connections, 3)
+
+    def test_reconnects_only_once(self):
+        self.sink.drop_after = 0
+        _, messages = self.messages(2)
+
+        with BatchSender(connection_kwargs=self.connection_kwargs) as sender:
+            results = sender.send_batch(messages)
+
+        self.assertIsInstance(results[0], smtplib.SMTPServerDisconnected)
+        self.assertIsInstance(results[1], smtplib.SMTPServerDisconnected)
+        self.assertEqual(self.sink.recipients, [])
+        # each message: its connection and one reconnect
+        self.assertEqual(self.sink.connections, 4)
+
+
+class FakeSender:
+    """Stands in for SenderPool, recording who was sent to."""
+
+    def __init__(self, refuse=(), code=451):
+        self.sent = []
+        self.refuse = set(refuse)
+        self.code = code
+        self.shares = []
+
+    def set_rate_share(self, share):
+        self.shares.append(share)
+
+    def send_batch(self, messages):
+        self.sent.extend(message.to[0] for message in messages)
+        return [
+            smtplib.SMTPResponseException(self.code, b"Refused")
+            if message.to[0] in self.refuse
+            else None
+            for message in messages
+        ]
+
+
+@override_settings(MAILER_LEASE_SIZE=20, MAILER_LEASE_SECONDS=60, MAILER_BATCH_SIZE=10)
+class SendJobLeasingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.campaign = Campaign.objects.create(campaign_name="Leasing")
+        add_recipients(cls.campaign)
+
+    def setUp(self):
+        self.job = SendJob.objects.create(campaign_id=self.campaign, email_template="1", message="Hi")
+
+    def test_plan_splits_the_campaign_into_batches(self):
+        self.assertEqual(plan_next_job(), self.job)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, SendJob.STATUS_RUNNING)
+
+        batches = list(self.job.batches.order_by("first_email_id"))
+        self.assertEqual(len(batches), 3)
+        ids = list(self.campaign.emails.order_by("email_id").values_list("email_id", flat=True))
+        self.assertEqual(
+            [(batch.first_email_id, batch.last_email_id) for batch in batches],
+            [(ids[0], ids[19]), (ids[20], ids[39]), (ids[40], ids[49])],
+        )
+        self.assertIsNone(plan_next_job())
+
+    def test_batches_are_leased_once_until_the_lease_expires(self):
+        plan_next_job()
+        first = lease_next_batch("worker-1")
+        second = lease_next_batch("worker-2")
+        self.assertNotEqual(first.batch_id, second.batch_id)
+        self.assertTrue(renew_lease(first, "worker-1"))
+
+        # worker-1 dies: its batch goes to the next worker that asks
+        SendBatch.objects.filter(batch_id=first.batch_id).update(
+            lease_expires_at=timezone.now() - timezone.timedelta(seconds=1)
+        )
+        third = lease_next_batch("worker-3")
+        self.assertEqual(third.batch_id, first.batch_id)
+        self.assertFalse(renew_lease(first, "worker-1"))
+
+    def test_send_workers_divide_the_rate_limit(self):
+        plan_next_job()
+        lease_next_batch("worker-2")
+        batch = lease_next_batch("worker-1")
+        sender = FakeSender()
+        self.assertTrue(run_send_batch(batch, "worker-1", sender, {}))
+        self.assertEqual(sender.shares, [0.5, 0.5, 0.5])
+
+        # worker-2 died: its lease no longer counts
+        SendBatch.objects.filter(leased_by="worker-2").update(
+            lease_expires_at=timezone.now() - timezone.timedelta(seconds=1)
+        )
+        sender = FakeSender()
+        self.assertTrue(run_send_batch(lease_next_batch("worker-1"), "worker-1", sender, {}))
+        self.assertEqual(sender.shares[-1], 1)
+
+    def test_resume_skips_recipients_already_sent(self):
+        plan_next_job()
+        sender = FakeSender()
+        batch = lease_next_batch("worker-1")
+        self.assertTrue(run_send_batch(batch, "worker-1", sender, {}))
+        self.assertEqual(len(sender.sent), 20)
+
+        SendJob.objects.filter(job_id=self.job.job_id).update(status=SendJob.STATUS_FAILED)
+        self.job.refresh_from_db()
+        resume_job(self.job)
+        self.assertEqual(plan_next_job(), self.job)
+
+        while True:
+            batch = lease_next_batch("worker-1")
+            if batch is None:
+                break
+            run_send_batch(batch, "worker-1", sender, {})
+
+        self.assertEqual(len(sender.sent), RECIPIENTS)
+        self.assertEqual(len(set(sender.sent)), RECIPIENTS)
+        self.job.refresh_from_db()
+        self.assertEqual(
+            (self.job.status, self.job.sent_count), (SendJob.STATUS_COMPLETED, RECIPIENTS)
+        )
+
+    def test_batch_leased_again_skips_failed_recipients(self):
+        plan_next_job()
+        batch = lease_next_batch("worker-1")
+        first = self.campaign.emails.order_by("email_id").first().email_address
+        run_send_batch(batch, "worker-1", FakeSender(refuse=[first], code=550), {})
+        self.assertFailedCounts(1)
+
+        # worker-1 stalled past its lease before marking the batch done
+        SendBatch.objects.filter(batch_id=batch.batch_id).update(
+            status=SendBatch.STATUS_LEASED,
+            lease_expires_at=timezone.now() - timezone.timedelta(seconds=1),
+        )
+        again = lease_next_batch("worker-2")
+        self.assertEqual(again.batch_id, batch.batch_id)
+        sender = FakeSender()
+        run_send_batch(again, "worker-2", sender, {})
+        self.assertEqual(sender.sent, [])
+        self.assertFailedCounts(1)
+
+        # a resume does try the failed recipient again
+        self.run_all_batches(FakeSender())
+        SendJob.objects.filter(job_id=self.job.job_id).update(status=SendJob.STATUS_FAILED)
+        self.job.refresh_from_db()
+        resume_job(self.job)
+        plan_next_job()
+        sender = FakeSender()
+        self.run_all_batches(sender)
+        self.assertEqual(sender.sent, [first])
+        self.assertFailedCounts(0)
+        self.assertEqual(self.job.sent_count, RECIPIENTS)
+
+    def run_all_batches(self, sender):
+        while True:
+            batch = lease_next_batch("worker-1")
+            if batch is None:
+                return
+            run_send_batch(batch, "worker-1", sender, {})
+
+    def assertFailedCounts(self, failed):
+        self.job.refresh_from_db()
+        self.campaign.refresh_from_db()
+        self.assertEqual((self.job.failed_count, self.campaign.failed_count), (failed, failed))
+
+    @override_settings(MAILER_RETRY_MAX_ATTEMPTS=1)
+    def test_replay_after_resume(self):
+        refused = [f"recipient{row}@example.com" for row in range(5)]
+        plan_next_job()
+        self.run_all_batches(FakeSender(refuse=refused))
+        self.assertFailedCounts(5)
+
+        # the resume resets the counters but leaves the dead letters in the ledger
+        self.job.refresh_from_db()
+        resume_job(self.job)
+        plan_next_job()
+        self.assertFailedCounts(0)
+        self.assertEqual(replay_dead_letters(self.job), 5)
+        self.assertFailedCounts(0)
+        self.assertEqual(
+            self.job.deliveries.filter(status=DeliveryRecord.STATUS_RETRY).count(), 5
+        )
+
+        # dead again, then resumed: the new run's dead letters are counted
+        # and a replay takes them off again
+        self.job.deliveries.filter(status=DeliveryRecord.STATUS_RETRY).update(
+            status=DeliveryRecord.STATUS_DEAD
+        )
+        SendJob.objects.filter(job_id=self.job.job_id).update(status=SendJob.STATUS_FAILED)
+        self.job.refresh_from_db()
+        resume_job(self.job)
+        plan_next_job()
+        self.run_all_batches(FakeSender(refuse=refused))
+        self.assertFailedCounts(5)
+        self.assertEqual(replay_dead_letters(self.job), 5)
+        self.assertFailedCounts(0)
+
+
+class ValidationTests(SimpleTestCase):
+    def test_normalize_email(self):
+        cases = {
+            "  Ann.Lee@Example.COM ": ("Ann.Lee@example.com", None),
+            "bob@gmial.com": ("bob@gmail.com", None),
+            "carl@hotmail.con.": ("carl@hotmail.com", None),
+            "dora@bücher.de": ("dora@xn--bcher-kva.de", None),
+            "o'neil+tag@example.org": ("o'neil+tag@example.org", None),
+            None: (None, ERROR_MISSING),
+            "   ": (None, ERROR_MISSING),
+            "no-at-sign": (None, ERROR_SYNTAX),
+            "two..dots@example.com": (None, ERROR_SYNTAX),
+            "@example.com": (None, ERROR_SYNTAX),
+            f"{'a' * 65}@example.com": (None, ERROR_SYNTAX),
+            "eve@localhost": (None, ERROR_DOMAIN),
+            "eve@exa_mple.com": (None, ERROR_DOMAIN),
+            "eve@example.c0m": (None, ERROR_DOMAIN),
+            f"{'a' * 64}@{'b' * 63}.{'c' * 63}.{'d' * 60}.com": (None, ERROR_LENGTH),
+        }
+        for value, expected in cases.items():
+            self.assertEqual(normalize_email(value), expected, value)
+
+    def test_validate_rows(self):
+        valid, invalid = validate_rows(
+            [
+                (2, "  Ann ", "ann@example.com"),
+                (3, None, "bob@example.com"),
+                (4, 42, "carl@example.com"),
+                (5, "Dora", "not an address"),
+                (6, "Eve", None),
+            ]
+        )
+        self.assertEqual(
+            valid,
+            [
+                (2, "Ann", "ann@example.com"),
+                (3, "", "bob@example.com"),
+                (4, "42", "carl@example.com"),
+            ],
+        )
+        self.assertEqual(
+            invalid, [(5, "not an address", ERROR_SYNTAX), (6, None, ERROR_MISSING)]
+        )
+
+
+class CsvTests(SimpleTestCase):
+    def rows(self, data):
+        return list(iter_csv_rows(io.BytesIO(data)))
+
+    def test_detect_encoding(self):
+        self.assertEqual(detect_encoding(b"\xef\xbb\xbfname,email\n"), "utf-8-sig")
+        self.assertEqual(detect_encoding(b"\xff\xfen\x00"), "utf-16")
+        self.assertEqual(detect_encoding("José,j@example.com".encode()), "utf-8")
+        self.assertEqual(detect_encoding("José,j@example.com".encode("cp1252")), "cp1252")
+        # a multi-byte character cut off at the end of the sample
+        self.assertEqual(detect_encoding("name,José".encode()[:-1]), "utf-8")
+
+    def test_sniffs_delimiter_and_encoding(self):
+        data = "Name;Email\nJosé;jose@example.com\n\"Lee; Ann\";ann@example.com\n"
+        self.assertEqual(
+            self.rows(data.encode("cp1252")),
+            [(2, "José", "jose@example.com"), (3, "Lee; Ann", "ann@example.com")],
+        )
+
+    def test_utf8_bom_and_tabs(self):
+        data = "\ufeffName\tEmail\nZoë\tzoe@example.com\n"
+        self.assertEqual(self.rows(data.encode("utf-8")), [(2, "Zoë", "zoe@example.com")])
+
+    def test_short_rows(self):
+        self.assertEqual(
+            self.rows(b"name,email\nonly-a-name\n\n"),
+            [(2, "only-a-name", None), (3, None, None)],
+        )
+
+
+class XlsxTests(SimpleTestCase):
+    def rows(self, sheets, sheet_name=None):
+        return list(iter_xlsx_rows(io.BytesIO(workbook(sheets)), sheet_name))
+
+    def test_first_two_columns_of_every_row(self):
+        sheet = [
+            ("Name", "Email"),
+            ("Ann", "ann@example.com", "extra", "columns"),
+            ("only-a-name",),
+            (),
+            (None, "nameless@example.com"),
+            (42, 3.5),
+            ("Bob", "bob@example.com"),
+        ]
+        self.assertEqual(
+            self.rows({"List": sheet}),
+            [
+                (2, "Ann", "ann@example.com"),
+                (3, "only-a-name", None),
+                (4, None, None),
+                (5, None, "nameless@example.com"),
+                (6, 42, 3.5),
+                (7, "Bob", "bob@example.com"),
+            ],
+        )
+
+    def test_named_or_active_sheet(self):
+        sheets = {
+            "First": [("Name", "Email"), ("Ann", "ann@example.com")],
+            "Second": [("Name", "Email"), ("Bob", "bob@example.com")],
+        }
+        self.assertEqual(self.rows(sheets), [(2, "Ann", "ann@example.com")])
+        self.assertEqual(self.rows(sheets, "Second"), [(2, "Bob", "bob@example.com")])
+        self.assertEqual(self.rows({"Empty": [("Name", "Email")]}), [])
+
+    def test_non_string_cells_are_rejected_by_validation(self):
+        rows = self.rows({"List": [("Name", "Email"), (42, 3.5), ("Ann", None)]})
+        valid, invalid = validate_rows(rows)
+        self.assertEqual(valid, [])
+        self.assertEqual([row_number for row_number, _, _ in invalid], [2, 3])
+
+
+class RecipientListTests(SimpleTestCase):
+    def listed(self, name, content):
+        return list(iter_recipient_list(io.BytesIO(content), name))
+
+    def test_import_layout_reads_only_the_email_column(self):
+        self.assertEqual(
+            self.listed("list.csv", b"name,email\n42,\nAnn,ann@example.com\n7\n"),
+            ["ann@example.com"],
+        )
+        sheet = [("Name", "Email"), (42, None), ("Ann", "ann@example.com"), ("Bob", 17)]
+        self.assertEqual(
+            self.listed("list.xlsx", workbook({"List": sheet})), ["ann@example.com", 17]
+        )
+
+    def test_single_column(self):
+        self.assertEqual(
+            self.listed("list.csv", b"email\nann@example.com\n\n42\n"),
+            ["ann@example.com", "42"],
+        )
+        sheet = [("Email or ID",), ("ann@example.com",), (None,), (42,)]
+        self.assertEqual(
+            self.listed("list.xlsx", workbook({"List": sheet})), ["ann@example.com", 42]
+        )
+
+    def test_split(self):
+        self.assertEqual(
+            split_recipient_list(["ann@example.com", " 42 ", 17, 3.0]),
+            (["ann@example.com"], [42, 17, 3]),
+        )
+        for value in (1.5, True):
+            with self.assertRaises(ValueError):
+                split_recipient_list([value])
+
+
+class CompiledTemplateTests(SimpleTestCase):
+    def test_matches_django_rendering(self):
+        context = {"name": "Ann <b>& Co</b>", "message": "Hello \"there\" & welcome"}
+        for template_name, _ in EMAIL_TEMPLATES.values():
+            compiled = CompiledTemplate(template_name, constants={"message": context["message"]})
+            self.assertIsNotNone(compiled.chunks, template_name)
+
+            # the old per-recipient rendering, with images moved to CID parts
+            expected, attachments = extract_inline_images(
+                render_to_string(template_name, context),
+                os.path.dirname(get_template(template_name).origin.name),
+            )
+            self.assertEqual(compiled.render(name=context["name"]), expected, template_name)
+            self.assertEqual(len(compiled.attachments), len(attachments), template_name)
+            self.assertNotIn("data:image", expected)
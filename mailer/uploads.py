@@ -0,0 +1,44 @@
+import hashlib
+
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """Spool uploads to a temporary file and SHA-256 them as the chunks arrive.
+
+    The hex digest is set as ``sha256`` on the uploaded file, so fingerprinting
+    an upload never reads it a second time.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hash = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hash.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.hash.hexdigest()
+        return file
+
+
+def content_hash(file):
+    """SHA-256 hex digest of an uploaded file, streamed if the handler did not set it."""
+    digest = getattr(file, "sha256", None)
+    if digest is None:
+        hash = hashlib.sha256()
+        for chunk in file.chunks():
+            hash.update(chunk)
+        digest = hash.hexdigest()
+        file.seek(0)
+    return digest
+
+
+def combined_hash(files):
+    """Fingerprint of a set of uploads: a file's own hash, or a hash of the hashes in order."""
+    digests = [content_hash(file) for file in files]
+    if len(digests) == 1:
+        return digests[0]
+    return hashlib.sha256("\n".join(digests).encode()).hexdigest()
@@ -12,7 +12,15 @@ urlpatterns = [
     # path('campaigns/<int:pk>/', CampaignDeleteView.as_view(), name='campaign_delete'),
     path('list-emails/', ListEmailView.as_view(), name='email_list'),
     path('upload-xls/', XLSReaderView.as_view(), name='upload_xls'),
+    path('import-job-status', ImportJobStatusView.as_view(), name='import_job_status'),
+    path('import-report/', ImportReportView.as_view(), name='import_report'),
+    path('import-report.csv', ImportReportDownloadView.as_view(), name='import_report_csv'),
     path('send-emails/', SendEmailsView.as_view(), name='send_emails'),
-    path('delete-email', DeleteEmailView.as_view(), name='delete_email')
+    path('send-job-status', SendJobStatusView.as_view(), name='send_job_status'),
+    path('resume-send-job', ResumeSendJobView.as_view(), name='resume_send_job'),
+    path('dead-letters/', DeadLetterListView.as_view(), name='dead_letters'),
+    path('replay-dead-letters', ReplayDeadLettersView.as_view(), name='replay_dead_letters'),
+    path('delete-email', DeleteEmailView.as_view(), name='delete_email'),
+    path('bulk-delete-emails', BulkDeleteEmailView.as_view(), name='bulk_delete_emails'),
     # path('sendemails', send_emails, name='send_emails'),
 ]
@@ -0,0 +1,126 @@
+import re
+from functools import lru_cache
+
+# dot-atom local part (RFC 5322, ASCII only, as Django's EmailValidator)
+LOCAL_PART_RE = re.compile(
+    r"[a-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[a-z0-9!#$%&'*+/=?^_`{|}~-]+)*\Z",
+    re.IGNORECASE,
+)
+
+# lowercase ASCII (post-IDNA) host name with an alphabetic or punycode TLD
+DOMAIN_RE = re.compile(
+    r"(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+(?:[a-z]{2,63}|xn--[a-z0-9-]{1,59})\Z"
+)
+
+# Email.email_address and Email.name column sizes
+MAX_EMAIL_LENGTH = 254
+MAX_NAME_LENGTH = 255
+
+# misspellings of the big mailbox providers seen in uploaded lists
+DOMAIN_TYPOS = {
+    "gmial.com": "gmail.com",
+    "gmai.com": "gmail.com",
+    "gmal.com": "gmail.com",
+    "gamil.com": "gmail.com",
+    "gnail.com": "gmail.com",
+    "gmail.co": "gmail.com",
+    "gmail.con": "gmail.com",
+    "gmail.cmo": "gmail.com",
+    "googlemail.con": "googlemail.com",
+    "hotmial.com": "hotmail.com",
+    "hotmai.com": "hotmail.com",
+    "hotmal.com": "hotmail.com",
+    "hotmail.co": "hotmail.com",
+    "hotmail.con": "hotmail.com",
+    "outlok.com": "outlook.com",
+    "outloo.com": "outlook.com",
+    "outlook.con": "outlook.com",
+    "yaho.com": "yahoo.com",
+    "yahooo.com": "yahoo.com",
+    "yahoo.con": "yahoo.com",
+    "yahoo.co": "yahoo.com",
+    "icloud.con": "icloud.com",
+    "iclod.com": "icloud.com",
+}
+
+ERROR_MISSING = "missing"
+ERROR_SYNTAX = "syntax"
+ERROR_DOMAIN = "domain"
+ERROR_LENGTH = "length"
+
+ERROR_MESSAGES = {
+    ERROR_MISSING: "Invalid or missing email address.",
+    ERROR_SYNTAX: "Invalid email address.",
+    ERROR_DOMAIN: "Invalid email domain.",
+    ERROR_LENGTH: "Email address is too long.",
+}
+
+
+@lru_cache(maxsize=65536)
+def normalize_domain(domain):
+    """Return (normalized domain, None) or (None, error code).
+
+    Domains are lowercased, IDNA-encoded and checked against the typo
+    table. Memoized, since a list holds few distinct domains.
+    """
+    domain = domain.lower().rstrip(".")
+    if not domain.isascii():
+        try:
+            domain = domain.encode("idna").decode("ascii")
+        except UnicodeError:
+            return None, ERROR_DOMAIN
+    domain = DOMAIN_TYPOS.get(domain, domain)
+    if len(domain) > 253 or not DOMAIN_RE.match(domain):
+        return None, ERROR_DOMAIN
+    return domain, None
+
+
+def normalize_email(value):
+    """Return (normalized address, None) or (None, error code) for a cell value."""
+    if value is None:
+        return None, ERROR_MISSING
+    if not isinstance(value, str):
+        value = str(value)
+    value = value.strip()
+    if not value:
+        return None, ERROR_MISSING
+
+    local, at, domain = value.rpartition("@")
+    if not at or not local or len(local) > 64 or not LOCAL_PART_RE.match(local):
+        return None, ERROR_SYNTAX
+
+    domain, error = normalize_domain(domain)
+    if error:
+        return None, error
+
+    address = f"{local}@{domain}"
+    if len(address) > MAX_EMAIL_LENGTH:
+        return None, ERROR_LENGTH
+    return address, None
+
+
+def validate_rows(rows):
+    """Validate a chunk of (row_number, name, email_address) rows.
+
+    Returns the valid rows with normalized addresses and string names, and
+    the invalid ones as (row_number, cell value, error code) tuples.
+    """
+    valid = []
+    invalid = []
+    # local aliases keep the per-row loop free of global and attribute lookups
+    add_valid = valid.append
+    add_invalid = invalid.append
+    normalize = normalize_email
+
+    for row_number, name, value in rows:
+        address, error = normalize(value)
+        if error:
+            add_invalid((row_number, value, error))
+            continue
+        if name is None:
+            name = ""
+        elif not isinstance(name, str):
+            name = str(name)
+        add_valid((row_number, name.strip()[:MAX_NAME_LENGTH], address))
+
+    return valid, invalid
@@ -1,18 +1,20 @@
-import openpyxl
-from openpyxl.utils.exceptions import InvalidFileException
-from django.core.mail import send_mail
+import csv
+import io
+import zipfile
 
 # from django.http import JsonResponse
 from django.shortcuts import render
-from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.db import connection, transaction
+from django.db.models.functions import Lower
 
 # from django.http import HttpResponse
 # from django.template import loader
-from django.core.mail import send_mail, send_mass_mail
-from django.template.loader import render_to_string
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.renderers import JSONRenderer
 from drf_spectacular.utils import (
     extend_schema,
     OpenApiParameter,
@@ -21,10 +23,44 @@ from drf_spectacular.utils import (
     OpenApiRequest,
 )
 from drf_spectacular.types import OpenApiTypes
-from .models import Email, Campaign
-from .serializers import EmailSerializer, CampaignSerializer
+from openpyxl.utils.exceptions import InvalidFileException
+from .models import Email, Campaign, SendJob, DeliveryRecord, ImportJob, ImportFile, ImportRowOutcome
+from .serializers import (
+    EmailSerializer,
+    CampaignSerializer,
+    SendJobSerializer,
+    DeliveryRecordSerializer,
+    ImportJobSerializer,
+    ImportRowOutcomeSerializer,
+)
+from .importer import (
+    BUNDLE_EXTENSIONS,
+    UPLOAD_EXTENSIONS,
+    add_recipients,
+    delete_recipients,
+    iter_recipient_list,
+    split_recipient_list,
+)
+from .caching import (
+    campaign_list_version,
+    get_campaign_list,
+    invalidate_campaign_list,
+    set_campaign_list,
+)
+from .uploads import combined_hash
+from .validation import ERROR_MESSAGES
+from .purging import delete_campaign
+from .recipients import export_recipients
+from .retries import replay_dead_letters
+from .sending import DEFAULT_MESSAGE, EMAIL_TEMPLATES, resume_job
 from django.conf import settings
 
+DEAD_LETTER_PAGE_SIZE = 100
+IMPORT_REPORT_PAGE_SIZE = 500
+EMAIL_PAGE_SIZE = 100
+MAX_EMAIL_PAGE_SIZE = 1000
+EXPORT_CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
 # 1) view for listing existing campaigns - list it with id, name
 # 2) view for adding new campaigns - user will provide campaign name and model will be created
 # 3) view for editing existing campaigns - user will provide campaign name and model will be updated - later (optional)
@@ -45,7 +81,10 @@ class CampaignListView(APIView):
                 examples={"application/json": {"error": "Error message"}},
             ),
         },
-        description="List all existing campaigns.",
+        description=(
+            "List all existing campaigns. Responses carry an ETag; send it back in "
+            "If-None-Match to get 304 Not Modified while the list is unchanged."
+        ),
         examples=[
             OpenApiExample(
                 "Example Response",
@@ -68,9 +107,26 @@ class CampaignListView(APIView):
     )
     def get(self, request):
         try:
-            campaigns = Campaign.objects.all().order_by("-created_at")
-            serializer = CampaignSerializer(campaigns, many=True)
-            return Response(serializer.data, status=200)
+            # the version is taken before querying, see invalidate_campaign_list
+            version = campaign_list_version()
+            etag = f'"{version}"'
+
+            if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+            if etag in if_none_match or "*" in if_none_match:
+                response = HttpResponseNotModified()
+            else:
+                body = get_campaign_list(version)
+                if body is None:
+                    campaigns = Campaign.objects.all().order_by("-created_at")
+                    serializer = CampaignSerializer(campaigns, many=True)
+                    body = JSONRenderer().render(serializer.data)
+                    set_campaign_list(version, body)
+                response = HttpResponse(body, content_type="application/json")
+
+            response["ETag"] = etag
+            # clients may keep the list but must revalidate it on every poll
+            response["Cache-Control"] = "no-cache"
+            return response
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
@@ -122,6 +178,7 @@ class CampaignCreateView(APIView):
                     )
 
                 serializer.save()
+                invalidate_campaign_list()
                 return Response(serializer.data, status=201)
 
             return Response(serializer.errors, status=400)
@@ -199,9 +256,12 @@ class XLSReaderView(APIView):
                 "type": "object",
                 "properties": {
                     "file": {
-                        "type": "string",
-                        "format": "binary",
-                        "description": "Excel file containing email data.",
+                        "type": "array",
+                        "items": {"type": "string", "format": "binary"},
+                        "description": (
+                            "One or more Excel (.xlsx) or CSV files containing email data, "
+                            "or zip bundles of them."
+                        ),
                     }
                 },
             }
@@ -213,32 +273,72 @@ class XLSReaderView(APIView):
                 location="query",
                 required=True,
                 description="ID of the campaign to associate the emails with.",
-            )
+            ),
+            OpenApiParameter(
+                "ingest",
+                type=str,
+                location="query",
+                required=False,
+                enum=["copy"],
+                description="Use 'copy' to bulk-ingest very large lists with PostgreSQL COPY instead of batched inserts.",
+            ),
+            OpenApiParameter(
+                "all_sheets",
+                type=bool,
+                location="query",
+                required=False,
+                description="Import every sheet of each workbook instead of only the active one.",
+            ),
+            OpenApiParameter(
+                "force",
+                type=bool,
+                location="query",
+                required=False,
+                description="Import the file even if identical bytes were already imported into the campaign.",
+            ),
         ],
         responses={
-            201: OpenApiResponse(
-                description="Emails saved successfully!",
+            200: OpenApiResponse(
+                description="The same file was already imported into the campaign; its import job is returned.",
+                examples={
+                    "application/json": {
+                        "message": "This file was already uploaded to this campaign.",
+                        "job_id": 1,
+                        "status": "completed",
+                        "details": {
+                            "rows": 1000,
+                            "inserted": 990,
+                            "duplicates": 8,
+                            "invalid": 2,
+                            "rows_per_second": 11500.0,
+                        },
+                    }
+                },
+            ),
+            202: OpenApiResponse(
+                description="Import queued.",
                 examples={
-                    "application/json": {"message": "Emails saved successfully!"}
+                    "application/json": {
+                        "message": "Import queued.",
+                        "job_id": 1,
+                        "status": "queued",
+                    }
                 },
             ),
             400: OpenApiResponse(
                 description="Error in file format, missing data, or invalid campaign ID.",
                 examples={"application/json": {"error": "Error message"}},
             ),
-            400: OpenApiResponse(
-                description="Email already exists in database.",
-                examples={"application/json": {"error": "Error message"}},
-            ),
-            500: OpenApiResponse(
-                description="Server-side error.",
-                examples={"application/json": {"error": "Error message"}},
-            ),
         },
         description=(
-            "Upload an Excel file to save email data into the database. "
-            "The file should contain 'name' and 'email_address' columns. "
-            "Provide a valid campaign ID as a query parameter to associate the emails with a campaign."
+            "Upload an Excel or CSV file to save email data into the database. "
+            "The file should contain 'name' and 'email_address' columns, after a header row. "
+            "CSV encoding and delimiter are detected automatically. "
+            "Provide a valid campaign ID as a query parameter to associate the emails with a campaign. "
+            "Several files, zip bundles and (with all_sheets) every sheet of a workbook can be imported at once; "
+            "they are parsed in parallel and deduplicated together. "
+            "The upload is queued as an import job; poll import-job-status for its progress and result. "
+            "Re-uploading identical bytes to the same campaign returns the earlier job unless force is set."
         ),
         examples=[
             OpenApiExample(
@@ -250,14 +350,17 @@ class XLSReaderView(APIView):
             ),
             OpenApiExample(
                 "Example Response",
-                value={"message": "Emails saved successfully!"},
+                value={"message": "Import queued.", "job_id": 1, "status": "queued"},
                 response_only=True,
             ),
         ],
     )
     def post(self, request):
-        file = request.FILES.get("file")
+        files = request.FILES.getlist("file")
         campaign_id = request.query_params.get("campaign_id")
+        ingest = request.query_params.get("ingest")
+        all_sheets = request.query_params.get("all_sheets", "").lower() in ("1", "true", "yes")
+        force = request.query_params.get("force", "").lower() in ("1", "true", "yes")
 
         # Step 1: Validate campaign ID
         if not campaign_id:
@@ -276,98 +379,298 @@ class XLSReaderView(APIView):
             )
 
         # Step 2: Validate file upload
-        if not file:
+        if not files:
             return Response(
                 {"error": "No file uploaded. Please provide an Excel file."}, status=400
             )
 
-        if not file.name.endswith((".xls", ".xlsx", ".csv")):
+        for file in files:
+            if not file.name.lower().endswith(UPLOAD_EXTENSIONS + BUNDLE_EXTENSIONS):
+                return Response(
+                    {"error": "Unsupported file format. Please upload an Excel file."},
+                    status=400,
+                )
+
+        if ingest not in (None, "", "copy"):
+            return Response({"error": "Unsupported ingest mode."}, status=400)
+
+        if ingest == "copy" and connection.vendor != "postgresql":
             return Response(
-                {"error": "Unsupported file format. Please upload an Excel file."},
-                status=400,
+                {"error": "COPY ingest is only available on PostgreSQL."}, status=400
             )
 
-        # Use openpyxl to read the Excel file
-        try:
-            # Step 3: Process the Excel file
-            wb = openpyxl.load_workbook(file)
-            sheet = wb.active
-
-            emails_to_save = []
-            invalid_rows = []
-            duplicate_email = []
-
-            # using a HashSet to query once (O(1)) instead of multiple queries (O(n)) in the loop.
-            # changable in the future
-            existing_emails = set(
-                Email.objects.filter(campaign_id=campaign).values_list(
-                    "email_address", flat=True
+        # Step 3: Identical bytes already imported (or being imported) into
+        # this campaign get that job back instead of a new import
+        digest = combined_hash(files)
+        if not force:
+            previous = (
+                ImportJob.objects.filter(
+                    campaign_id=campaign, content_hash=digest, all_sheets=all_sheets
                 )
+                .exclude(status=ImportJob.STATUS_FAILED)
+                .order_by("-created_at")
+                .first()
             )
-
-            for row_number, row in enumerate(
-                sheet.iter_rows(min_row=2), start=2
-            ):  # Start from the second row
-                name = row[0].value
-                recipient_email = row[1].value
-
-                # Row validation
-                if not recipient_email or "@" not in recipient_email:
-                    invalid_rows.append(
-                        {
-                            "row": row_number,
-                            "error": "Invalid or missing email address.",
-                        }
-                    )
-                    continue
-
-                # Skip if email already exists
-                if recipient_email in existing_emails:
-                    duplicate_email.append(recipient_email)
-                    continue  # skips the email if its already there :)
-
-                # Prepare the data for bulk create
-                emails_to_save.append(
-                    Email(
-                        campaign_id=campaign,
-                        name=name,
-                        email_address=recipient_email,
-                    )
-                )
-
-            # Step 4: Save emails to the database
-            with transaction.atomic():
-                Email.objects.bulk_create(emails_to_save)
-
-            if invalid_rows:
+            if previous is not None:
                 return Response(
                     {
-                        "message": f"Emails saved successfully, but some rows were invalid.",
-                        "invalid_rows": invalid_rows,
+                        "message": "This file was already uploaded to this campaign.",
+                        "job_id": previous.job_id,
+                        "status": previous.status,
+                        "details": ImportJobSerializer(previous).data["details"],
                     },
-                    status=201,
+                    status=200,
                 )
 
-            if len(duplicate_email) != 0:
-                return Response(
-                    {
-                        "message": f"Emails saved successfully, but some emails already exists in database under campaign ID {campaign_id}",
-                        "duplicate email count": len(duplicate_email),
-                        "duplicate emails": duplicate_email,
+        # Step 4: Queue the spooled uploads for import_worker
+        with transaction.atomic():
+            job = ImportJob.objects.create(
+                campaign_id=campaign,
+                file_name=", ".join(file.name for file in files)[:255],
+                content_hash=digest,
+                ingest=ingest or ImportJob.INGEST_INSERT,
+                all_sheets=all_sheets,
+            )
+            for file in files:
+                ImportFile.objects.create(job_id=job, file=file, file_name=file.name)
+
+        return Response(
+            {
+                "message": "Import queued.",
+                "job_id": job.job_id,
+                "status": job.status,
+            },
+            status=202,
+        )
+
+
+class ImportJobStatusView(APIView):
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "job_id",
+                type=int,
+                location="query",
+                required=True,
+                description="ID of the import job returned by upload-xls.",
+            )
+        ],
+        responses={
+            200: ImportJobSerializer,
+            400: OpenApiResponse(
+                description="Invalid or missing job ID.",
+                examples={"application/json": {"error": "Job ID is required."}},
+            ),
+            404: OpenApiResponse(
+                description="Import job not found.",
+                examples={"application/json": {"error": "Import job not found."}},
+            ),
+        },
+        description="Get the progress, throughput and result of an import job.",
+        examples=[
+            OpenApiExample(
+                "Example Response",
+                value={
+                    "job_id": 1,
+                    "campaign_id": 1,
+                    "file_name": "recipients.xlsx",
+                    "ingest": "insert",
+                    "all_sheets": False,
+                    "status": "running",
+                    "details": {
+                        "rows": 250000,
+                        "inserted": 248000,
+                        "duplicates": 1990,
+                        "invalid": 10,
+                        "rows_per_second": 11500.0,
                     },
-                    status=201,
-                )
+                    "error": "",
+                    "created_at": "2025-01-27T10:00:00Z",
+                    "started_at": "2025-01-27T10:00:01Z",
+                    "finished_at": None,
+                },
+                response_only=True,
+            ),
+        ],
+    )
+    def get(self, request):
+        job_id = request.query_params.get("job_id")
 
-            return Response({"message": "Emails saved successfully!"}, status=201)
+        if not job_id:
+            return Response({"error": "Job ID is required."}, status=400)
 
-        except InvalidFileException:
-            return Response(
-                {"error": "Invalid Excel file. Please upload a valid Excel file."},
-                status=400,
+        try:
+            job = ImportJob.objects.get(
+                job_id=int(job_id), campaign_id__deleted_at__isnull=True
             )
+        except ValueError:
+            return Response({"error": "Job ID must be an integer."}, status=400)
+        except ImportJob.DoesNotExist:
+            return Response({"error": "Import job not found."}, status=404)
 
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
+        return Response(ImportJobSerializer(job).data, status=200)
+
+
+class ImportReportView(APIView):
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "job_id",
+                type=int,
+                location="query",
+                required=True,
+                description="ID of the import job.",
+            ),
+            OpenApiParameter(
+                "outcome",
+                type=str,
+                location="query",
+                required=False,
+                enum=["duplicate", "invalid"],
+                description="Only return rows with this outcome.",
+            ),
+            OpenApiParameter(
+                "after",
+                type=int,
+                location="query",
+                required=False,
+                description="Return rows after this outcome ID (the previous page's next value).",
+            ),
+        ],
+        responses={
+            200: OpenApiResponse(
+                description="A page of the rows of an import that were not inserted.",
+                examples={
+                    "application/json": {
+                        "results": [
+                            {
+                                "outcome_id": 12,
+                                "source": "recipients.xlsx",
+                                "row_number": 7,
+                                "outcome": "invalid",
+                                "email_address": "john.doe@",
+                                "error": "Invalid email address.",
+                            }
+                        ],
+                        "next": None,
+                    }
+                },
+            ),
+            400: OpenApiResponse(
+                description="Invalid or missing job ID.",
+                examples={"application/json": {"error": "Job ID is required."}},
+            ),
+            404: OpenApiResponse(
+                description="Import job not found.",
+                examples={"application/json": {"error": "Import job not found."}},
+            ),
+        },
+        description="List the duplicate and invalid rows of an import job, a page at a time.",
+    )
+    def get(self, request):
+        job_id = request.query_params.get("job_id")
+        outcome = request.query_params.get("outcome")
+        after = request.query_params.get("after") or 0
+
+        if not job_id:
+            return Response({"error": "Job ID is required."}, status=400)
+
+        try:
+            job = ImportJob.objects.get(
+                job_id=int(job_id), campaign_id__deleted_at__isnull=True
+            )
+            outcomes = ImportRowOutcome.objects.filter(job_id=job, outcome_id__gt=int(after))
+        except ValueError:
+            return Response({"error": "Job ID and after must be integers."}, status=400)
+        except ImportJob.DoesNotExist:
+            return Response({"error": "Import job not found."}, status=404)
+        if outcome:
+            outcomes = outcomes.filter(outcome=outcome)
+
+        outcomes = list(outcomes.order_by("outcome_id")[:IMPORT_REPORT_PAGE_SIZE])
+        return Response(
+            {
+                "results": ImportRowOutcomeSerializer(outcomes, many=True).data,
+                "next": outcomes[-1].outcome_id
+                if len(outcomes) == IMPORT_REPORT_PAGE_SIZE
+                else None,
+            },
+            status=200,
+        )
+
+
+class ImportReportDownloadView(APIView):
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "job_id",
+                type=int,
+                location="query",
+                required=True,
+                description="ID of the import job.",
+            ),
+        ],
+        responses={
+            (200, "text/csv"): OpenApiResponse(
+                response=OpenApiTypes.STR,
+                description="CSV of every duplicate and invalid row: source, row, outcome, email_address, error.",
+            ),
+            400: OpenApiResponse(
+                description="Invalid or missing job ID.",
+                examples={"application/json": {"error": "Job ID is required."}},
+            ),
+            404: OpenApiResponse(
+                description="Import job not found.",
+                examples={"application/json": {"error": "Import job not found."}},
+            ),
+        },
+        description="Download an import job's duplicate and invalid rows as a streamed CSV file.",
+    )
+    def get(self, request):
+        job_id = request.query_params.get("job_id")
+
+        if not job_id:
+            return Response({"error": "Job ID is required."}, status=400)
+
+        try:
+            job = ImportJob.objects.get(
+                job_id=int(job_id), campaign_id__deleted_at__isnull=True
+            )
+        except ValueError:
+            return Response({"error": "Job ID must be an integer."}, status=400)
+        except ImportJob.DoesNotExist:
+            return Response({"error": "Import job not found."}, status=404)
+
+        def lines():
+            out = io.StringIO()
+            writer = csv.writer(out)
+            writer.writerow(["source", "row", "outcome", "email_address", "error"])
+            after = 0
+            while True:
+                # keyset pages, so no query or cursor stays open between chunks
+                page = list(
+                    ImportRowOutcome.objects.filter(job_id=job, outcome_id__gt=after)
+                    .order_by("outcome_id")
+                    .values_list(
+                        "outcome_id", "source", "row_number", "outcome", "email_address", "error"
+                    )[:2000]
+                )
+                for outcome_id, source, row_number, outcome, email_address, error in page:
+                    writer.writerow(
+                        [source, row_number, outcome, email_address, ERROR_MESSAGES.get(error, "")]
+                    )
+                yield out.getvalue()
+                out.seek(0)
+                out.truncate()
+                if len(page) < 2000:
+                    return
+                after = page[-1][0]
+
+        response = StreamingHttpResponse(lines(), content_type="text/csv")
+        response["Content-Disposition"] = (
+            f'attachment; filename="import-{job.job_id}-report.csv"'
+        )
+        return response
 
 
 class SendEmailsView(APIView):
@@ -404,18 +707,19 @@ class SendEmailsView(APIView):
             }
         },
         responses={
-            200: OpenApiResponse(
-                description="Emails processed successfully.",
+            202: OpenApiResponse(
+                description="Send job queued. Poll send-job-status with the returned job ID for progress.",
                 examples={
                     "application/json": {
-                        "message": "Emails processed.",
-                        "details": {"sent": 10, "failed": 2},
+                        "message": "Send job queued.",
+                        "job_id": 1,
+                        "status": "queued",
                         "custom_message_used": "Thank you for applying to the AUTOSAD Get Certified program. We're thrilled to have you on board and look forward to helping you gain the knowledge and credentials to excel in the AUTOSAD ecosystem. To finalize your enrollment and start your certification journey, simply click the link below to complete your registration process.",
                     }
                 },
             ),
             400: OpenApiResponse(
-                description="Invalid or missing campaign ID.",
+                description="Invalid or missing campaign ID or email template.",
                 examples={
                     "application/json": {"error": "Invalid or missing campaign ID."}
                 },
@@ -433,7 +737,7 @@ class SendEmailsView(APIView):
                 examples={"application/json": {"error": "Internal server error."}},
             ),
         },
-        description="Send emails to all recipients associated with a specific campaign. Optionally provide a custom message.\n (Make sure the email list is uploaded for specific campaign ID before sending emails)",
+        description="Queue a send job for all recipients associated with a specific campaign. Optionally provide a custom message.\n (Make sure the email list is uploaded for specific campaign ID before sending emails)\n Emails are sent in the background by the send_worker management command.",
     )
     def post(self, request):
         # Get campaign ID from query parameters
@@ -446,14 +750,15 @@ class SendEmailsView(APIView):
         if not email_template:
             return Response({"error": "Email Template is required."}, status=400)
 
+        if email_template not in EMAIL_TEMPLATES:
+            return Response({"error": "Error. Template not found."}, status=400)
+
         try:
             campaign = Campaign.objects.get(campaign_id=campaign_id)
         except Campaign.DoesNotExist:
             return Response({"error": "Campaign not found."}, status=404)
 
-        emails = Email.objects.filter(campaign_id=campaign)
-
-        if not emails.exists():
+        if not Email.objects.filter(campaign_id=campaign).exists():
             return Response(
                 {"error": "No emails found for the given campaign."}, status=404
             )
@@ -462,74 +767,283 @@ class SendEmailsView(APIView):
         custom_message = request.data.get("message")
 
         if not custom_message:
-            custom_message = "Thank you for applying to the AUTOSAD Get Certified program. We're thrilled to have you on board and look forward to helping you gain the knowledge and credentials to excel in the AUTOSAD ecosystem. To finalize your enrollment and start your certification journey, simply click the link below to complete your registration process."
-        success_count = 0
-        failure_count = 0
+            custom_message = DEFAULT_MESSAGE
 
         try:
-            if email_template == "1":
-                from_email = "autosad-temp-email.html"
-                subject = "Welcome to AUTOSAD Get Certified"
-            elif email_template == "2":
-                from_email = "XCV_AI.html"
-                subject = "Welcome onboard to XCV AI"
-            elif email_template == "3":
-                from_email = "autosad-temp-email2.html"
-                subject = "Welcome to AUTOSAD Get Certified"
-            elif email_template == "4":
-                from_email = "autosad-email-temp-3.html"
-                subject = "Welcome to AUTOSAD"
-
-        except:
-            return Response({"error": "Error. Template not found."}, status=400)
+            job = SendJob.objects.create(
+                campaign_id=campaign,
+                email_template=email_template,
+                message=custom_message,
+            )
+        except Exception as e:
+            return Response({"error": str(e)}, status=500)
 
-        for email in emails:
-            try:
-                context = {
-                    "name": email.name,
-                    "message": custom_message,
-                }
-
-                html_content = render_to_string(from_email, context)
-
-                send_mail(
-                    subject=subject,
-                    message="",
-                    from_email="info@autosad.ai",
-                    recipient_list=[email.email_address],
-                    html_message=html_content,
-                )
-                success_count += 1
-
-            except Exception as e:
-                failure_count += 1
-                print(f"Failed to send email to {email.email_address}: {str(e)}")
-
-        # for later purpose.
-
-        # context = {'name': email.name, 'message': custom_message}
-        # html_content = render_to_string(from_email, context)
-        # email_msg = email.EmailMessage(
-        #     subject,
-        #     html_content,
-        #     'info@autosad.ai',
-        #     [email.email_address],
-        #     connection=connection,  # Reuse connection here
-        # )
-        # email_msg.content_subtype = 'html'
-        # email_msg.send()
+        return Response(
+            {
+                "message": "Send job queued.",
+                "job_id": job.job_id,
+                "status": job.status,
+                "custom_message_used": custom_message,
+            },
+            status=202,
+        )
+
+
+class SendJobStatusView(APIView):
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "job_id",
+                type=int,
+                location="query",
+                required=True,
+                description="ID of the send job returned by send-emails.",
+            )
+        ],
+        responses={
+            200: SendJobSerializer,
+            400: OpenApiResponse(
+                description="Invalid or missing job ID.",
+                examples={"application/json": {"error": "Job ID is required."}},
+            ),
+            404: OpenApiResponse(
+                description="Send job not found.",
+                examples={"application/json": {"error": "Send job not found."}},
+            ),
+        },
+        description="Get the status and sent/failed counts of a send job.",
+        examples=[
+            OpenApiExample(
+                "Example Response",
+                value={
+                    "job_id": 1,
+                    "campaign_id": 1,
+                    "email_template": "4",
+                    "status": "completed",
+                    "details": {"sent": 10, "failed": 2, "retrying": 0},
+                    "error": "",
+                    "created_at": "2025-01-27T10:00:00Z",
+                    "started_at": "2025-01-27T10:00:02Z",
+                    "finished_at": "2025-01-27T10:03:40Z",
+                },
+                response_only=True,
+            ),
+        ],
+    )
+    def get(self, request):
+        job_id = request.query_params.get("job_id")
+
+        if not job_id:
+            return Response({"error": "Job ID is required."}, status=400)
+
+        try:
+            job = SendJob.objects.get(
+                job_id=int(job_id), campaign_id__deleted_at__isnull=True
+            )
+        except ValueError:
+            return Response({"error": "Job ID must be an integer."}, status=400)
+        except SendJob.DoesNotExist:
+            return Response({"error": "Send job not found."}, status=404)
+
+        return Response(SendJobSerializer(job).data, status=200)
+
+
+class ResumeSendJobView(APIView):
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "job_id",
+                type=int,
+                location="query",
+                required=True,
+                description="ID of the send job to resume.",
+            ),
+        ],
+        responses={
+            202: OpenApiResponse(
+                description="Send job queued again.",
+                examples={
+                    "application/json": {
+                        "message": "Send job queued to resume.",
+                        "job_id": 1,
+                        "status": "queued",
+                        "already_sent": 25000,
+                    }
+                },
+            ),
+            400: OpenApiResponse(
+                description="Invalid job ID or the job is already queued or running.",
+                examples={"application/json": {"error": "Send job is already queued."}},
+            ),
+            404: OpenApiResponse(
+                description="Send job not found.",
+                examples={"application/json": {"error": "Send job not found."}},
+            ),
+        },
+        description="Queue a send job again. Recipients the delivery ledger already has as sent are skipped, so only the remaining recipients are emailed.",
+    )
+    def post(self, request):
+        job_id = request.query_params.get("job_id")
+
+        if not job_id:
+            return Response({"error": "Job ID is required."}, status=400)
+
+        try:
+            job = SendJob.objects.get(
+                job_id=int(job_id), campaign_id__deleted_at__isnull=True
+            )
+        except ValueError:
+            return Response({"error": "Job ID must be an integer."}, status=400)
+        except SendJob.DoesNotExist:
+            return Response({"error": "Send job not found."}, status=404)
+
+        if job.status == SendJob.STATUS_QUEUED:
+            return Response({"error": "Send job is already queued."}, status=400)
+
+        if job.status == SendJob.STATUS_RUNNING:
+            # batches held by a worker that died are leased again automatically
+            # once their lease expires, so a running job never needs resuming
+            return Response({"error": "Send job is still running."}, status=400)
+
+        resume_job(job)
 
         return Response(
             {
-                "message": "Emails sent successfully!",
-                "details": {
-                    "sent": success_count,
-                    "failed": failure_count,
+                "message": "Send job queued to resume.",
+                "job_id": job.job_id,
+                "status": job.status,
+                "already_sent": job.deliveries.filter(
+                    status=DeliveryRecord.STATUS_SENT
+                ).count(),
+            },
+            status=202,
+        )
+
+
+class DeadLetterListView(APIView):
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "job_id",
+                type=int,
+                location="query",
+                required=True,
+                description="ID of the send job.",
+            ),
+            OpenApiParameter(
+                "after",
+                type=int,
+                location="query",
+                required=False,
+                description="Return dead letters after this record ID (the previous page's next value).",
+            ),
+        ],
+        responses={
+            200: OpenApiResponse(
+                description="A page of dead letters for the job.",
+                examples={
+                    "application/json": {
+                        "results": [
+                            {
+                                "record_id": 42,
+                                "job_id": 1,
+                                "email_id": 7,
+                                "email_address": "john.doe@example.com",
+                                "status": "dead",
+                                "smtp_code": 451,
+                                "smtp_response": "(451, b'4.7.0 Try again later')",
+                                "attempts": 5,
+                                "next_attempt_at": None,
+                                "sent_at": None,
+                                "updated_at": "2025-01-27T12:00:00Z",
+                            }
+                        ],
+                        "next": None,
+                    }
                 },
-                "custom_message_used": custom_message,
+            ),
+            400: OpenApiResponse(
+                description="Invalid or missing job ID.",
+                examples={"application/json": {"error": "Job ID is required."}},
+            ),
+        },
+        description="List deliveries of a send job that exhausted their retries.",
+    )
+    def get(self, request):
+        job_id = request.query_params.get("job_id")
+        after = request.query_params.get("after") or 0
+
+        if not job_id:
+            return Response({"error": "Job ID is required."}, status=400)
+
+        try:
+            records = list(
+                DeliveryRecord.objects.filter(
+                    job_id=int(job_id),
+                    job_id__campaign_id__deleted_at__isnull=True,
+                    status=DeliveryRecord.STATUS_DEAD,
+                    record_id__gt=int(after),
+                ).order_by("record_id")[:DEAD_LETTER_PAGE_SIZE]
+            )
+        except ValueError:
+            return Response({"error": "Job ID and after must be integers."}, status=400)
+
+        return Response(
+            {
+                "results": DeliveryRecordSerializer(records, many=True).data,
+                "next": records[-1].record_id
+                if len(records) == DEAD_LETTER_PAGE_SIZE
+                else None,
             },
-            status=200 if failure_count == 0 else 207,
-        )  # 207: Multi-Status for partial success
+            status=200,
+        )
+
+
+class ReplayDeadLettersView(APIView):
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "job_id",
+                type=int,
+                location="query",
+                required=True,
+                description="ID of the send job whose dead letters should be retried.",
+            )
+        ],
+        responses={
+            202: OpenApiResponse(
+                description="Dead letters moved back to the retry queue.",
+                examples={"application/json": {"job_id": 1, "replayed": 12}},
+            ),
+            400: OpenApiResponse(
+                description="Invalid or missing job ID.",
+                examples={"application/json": {"error": "Job ID is required."}},
+            ),
+            404: OpenApiResponse(
+                description="Send job not found.",
+                examples={"application/json": {"error": "Send job not found."}},
+            ),
+        },
+        description="Move every dead letter of a send job back onto the retry queue with a fresh retry budget.",
+    )
+    def post(self, request):
+        job_id = request.query_params.get("job_id")
+
+        if not job_id:
+            return Response({"error": "Job ID is required."}, status=400)
+
+        try:
+            job = SendJob.objects.get(
+                job_id=int(job_id), campaign_id__deleted_at__isnull=True
+            )
+        except ValueError:
+            return Response({"error": "Job ID must be an integer."}, status=400)
+        except SendJob.DoesNotExist:
+            return Response({"error": "Send job not found."}, status=404)
+
+        return Response(
+            {"job_id": job.job_id, "replayed": replay_dead_letters(job)}, status=202
+        )
 
 
 class ListEmailView(APIView):
@@ -541,30 +1055,57 @@ class ListEmailView(APIView):
                 location="query",
                 required=True,
                 description="ID of the campaign to list emails for.",
-            )
+            ),
+            OpenApiParameter(
+                "cursor",
+                type=int,
+                location="query",
+                required=False,
+                description="Return emails after this email ID (the previous page's next_cursor).",
+            ),
+            OpenApiParameter(
+                "page_size",
+                type=int,
+                location="query",
+                required=False,
+                description=f"Emails per page (default {EMAIL_PAGE_SIZE}, at most {MAX_EMAIL_PAGE_SIZE}).",
+            ),
+            OpenApiParameter(
+                "export",
+                type=str,
+                location="query",
+                required=False,
+                enum=["ndjson", "csv"],
+                description="Stream every email of the campaign as NDJSON or CSV instead of a page.",
+            ),
         ],
         responses={
             200: OpenApiResponse(
-                description="List of emails associated with the given campaign.",
+                description="A page of emails associated with the given campaign, or a streamed export.",
                 examples={
-                    "application/json": [
-                        {
-                            "email_address": "john.doe@example.com",
-                            "name": "John Doe",
-                            "campaign_id": 1,
-                            "added_at": "2025-01-01T12:00:00Z",
-                        },
-                        {
-                            "email_address": "jane.smith@example.com",
-                            "name": "Jane Smith",
-                            "campaign_id": 2,
-                            "added_at": "2025-01-10T14:00:00Z",
-                        },
-                    ]
+                    "application/json": {
+                        "results": [
+                            {
+                                "email_id": 1,
+                                "email_address": "john.doe@example.com",
+                                "name": "John Doe",
+                                "campaign_id": 1,
+                                "added_at": "2025-01-01T12:00:00Z",
+                            },
+                            {
+                                "email_id": 2,
+                                "email_address": "jane.smith@example.com",
+                                "name": "Jane Smith",
+                                "campaign_id": 1,
+                                "added_at": "2025-01-10T14:00:00Z",
+                            },
+                        ],
+                        "next_cursor": None,
+                    }
                 },
             ),
             400: OpenApiResponse(
-                description="Invalid or missing campaign ID.",
+                description="Invalid or missing campaign ID, cursor or page size.",
                 examples={
                     "application/json": {"error": "Invalid or missing campaign ID."}
                 },
@@ -582,30 +1123,69 @@ class ListEmailView(APIView):
                 examples={"application/json": {"error": "Internal server error."}},
             ),
         },
-        description="List all emails stored in the database for a specific campaign.",
+        description=(
+            "List the emails stored in the database for a specific campaign, a page at a time "
+            "in email ID order, or export all of them as a streamed NDJSON or CSV file."
+        ),
     )
     def get(self, request):
         # Get campaign ID from query parameters
         campaign_id = request.query_params.get("campaign_id")
+        cursor = request.query_params.get("cursor")
+        page_size = request.query_params.get("page_size")
+        export = request.query_params.get("export")
 
         if not campaign_id:
             return Response({"error": "Campaign ID is required."}, status=400)
 
         try:
-            campaign = Campaign.objects.get(campaign_id=campaign_id)
+            campaign = Campaign.objects.get(campaign_id=int(campaign_id))
+            cursor = int(cursor) if cursor else 0
+            page_size = int(page_size) if page_size else EMAIL_PAGE_SIZE
+        except ValueError:
+            return Response(
+                {"error": "Campaign ID, cursor and page size must be integers."},
+                status=400,
+            )
         except Campaign.DoesNotExist:
             return Response({"error": "Campaign not found."}, status=404)
 
+        if export:
+            if export not in EXPORT_CONTENT_TYPES:
+                return Response({"error": "Unsupported export format."}, status=400)
+            response = StreamingHttpResponse(
+                export_recipients(campaign.campaign_id, export),
+                content_type=EXPORT_CONTENT_TYPES[export],
+            )
+            response["Content-Disposition"] = (
+                f'attachment; filename="campaign-{campaign.campaign_id}-emails.{export}"'
+            )
+            return response
+
+        page_size = max(1, min(page_size, MAX_EMAIL_PAGE_SIZE))
+
         try:
-            emails = Email.objects.filter(campaign_id=campaign)
+            # one extra row tells whether there is a next page
+            emails = list(
+                Email.objects.filter(campaign_id=campaign, email_id__gt=cursor)
+                .order_by("email_id")[: page_size + 1]
+            )
 
-            if not emails.exists():
+            if not emails and not cursor:
                 return Response(
                     {"error": "No emails found for the given campaign."}, status=404
                 )
 
-            serializer = EmailSerializer(emails, many=True)
-            return Response(serializer.data, status=200)
+            serializer = EmailSerializer(emails[:page_size], many=True)
+            return Response(
+                {
+                    "results": serializer.data,
+                    "next_cursor": emails[page_size - 1].email_id
+                    if len(emails) > page_size
+                    else None,
+                },
+                status=200,
+            )
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
@@ -674,6 +1254,7 @@ class UpdateCampaignView(APIView):
         try:
             campaign.campaign_name = updated_campaign_name
             campaign.save()
+            invalidate_campaign_list()
 
             return Response(
                 {
@@ -700,11 +1281,11 @@ class DeleteCampaignView(APIView):
             )
         ],
         responses={
-            200: OpenApiResponse(
-                description="Campaign deleted successfully.",
+            202: OpenApiResponse(
+                description="Campaign deleted; its emails are purged in the background.",
                 examples={
                     "application/json": {
-                        "message": "Campaign and associated emails deleted successfully.",
+                        "message": "Campaign deleted. Its emails will be purged in the background.",
                         "campaign_id": 1,
                     }
                 },
@@ -724,7 +1305,12 @@ class DeleteCampaignView(APIView):
                 examples={"application/json": {"error": "Internal server error."}},
             ),
         },
-        description="Delete a specific campaign and all its associated emails from the database.",
+        description=(
+            "Delete a specific campaign and all its associated emails from the database. "
+            "The campaign disappears from every endpoint at once and its queued or running "
+            "send jobs are stopped; the purge_campaigns worker then removes its emails "
+            "and history in the background."
+        ),
     )
     def post(self, request):
         campaign_id = request.query_params.get("campaign_id")
@@ -733,24 +1319,20 @@ class DeleteCampaignView(APIView):
             return Response({"error": "Campaign ID is required."}, status=400)
 
         try:
-            campaign = Campaign.objects.get(campaign_id=campaign_id)
-        except Campaign.DoesNotExist:
-            return Response({"error": "Campaign not found."}, status=404)
-
-        try:
-            campaign = Campaign.objects.get(campaign_id=campaign_id)
-        except Campaign.DoesNotExist:
-            return Response({"error": "Campaign not found."}, status=404)
+            campaign_id = int(campaign_id)
+        except ValueError:
+            return Response({"error": "Campaign ID must be an integer."}, status=400)
 
         try:
-            campaign.delete()
+            if not delete_campaign(campaign_id):
+                return Response({"error": "Campaign not found."}, status=404)
 
             return Response(
                 {
-                    "message": "Campaign and associated emails deleted successfully.",
+                    "message": "Campaign deleted. Its emails will be purged in the background.",
                     "campaign_id": campaign_id,
                 },
-                status=200,
+                status=202,
             )
 
         except Exception as e:
@@ -826,7 +1408,16 @@ class DeleteEmailView(APIView):
         #     )
 
         try:
-            email = Email.objects.get(email_address=email_add, campaign_id=campaign_id)
+            # addresses are unique per campaign whatever their case; matching on
+            # lower() uses that unique index
+            email = (
+                Email.objects.alias(address=Lower("email_address"))
+                .get(
+                    address=email_add.lower(),
+                    campaign_id=campaign_id,
+                    campaign_id__deleted_at__isnull=True,
+                )
+            )
         except Email.DoesNotExist:
             return Response(
                 {
@@ -836,7 +1427,9 @@ class DeleteEmailView(APIView):
             )
 
         try:
-            email.delete()
+            with transaction.atomic():
+                email.delete()
+                add_recipients(email.campaign_id_id, -1)
             return Response(
                 {
                     "Message": "Campaign and associated emails deleted successfully.",
@@ -849,6 +1442,140 @@ class DeleteEmailView(APIView):
             return Response({"error": str(e)}, status=500)
 
 
+class BulkDeleteEmailView(APIView):
+    parser_classes = [JSONParser, MultiPartParser]
+
+    @extend_schema(
+        request={
+            "application/json": {
+                "type": "object",
+                "properties": {
+                    "email_addresses": {"type": "array", "items": {"type": "string"}},
+                    "email_ids": {"type": "array", "items": {"type": "integer"}},
+                },
+            },
+            "multipart/form-data": {
+                "type": "object",
+                "properties": {
+                    "file": {
+                        "type": "string",
+                        "format": "binary",
+                        "description": (
+                            "Excel (.xlsx) or CSV file listing the addresses or email IDs to delete, "
+                            "after a header row: either the import layout (name, email_address), "
+                            "of which only the email column is read, or a single column."
+                        ),
+                    }
+                },
+            },
+        },
+        parameters=[
+            OpenApiParameter(
+                "campaign_id",
+                type=int,
+                location="query",
+                required=True,
+                description="ID of the campaign to delete the emails from.",
+            ),
+        ],
+        responses={
+            200: OpenApiResponse(
+                description="Emails deleted; counts are given per batch.",
+                examples={
+                    "application/json": {
+                        "campaign_id": 1,
+                        "requested": 1500,
+                        "deleted": 1498,
+                        "batches": [
+                            {"field": "email_address", "requested": 1000, "deleted": 999},
+                            {"field": "email_address", "requested": 500, "deleted": 499},
+                        ],
+                    }
+                },
+            ),
+            400: OpenApiResponse(
+                description="Missing or invalid campaign ID, list or file.",
+                examples={"application/json": {"error": "Error message"}},
+            ),
+            404: OpenApiResponse(
+                description="Campaign not found.",
+                examples={"application/json": {"error": "Campaign not found."}},
+            ),
+            500: OpenApiResponse(
+                description="Internal server error.",
+                examples={"application/json": {"error": "Internal server error."}},
+            ),
+        },
+        description=(
+            "Delete many email addresses from a campaign at once. Provide the addresses and/or "
+            "email IDs as JSON lists, or upload a file listing them. Addresses match "
+            "case-insensitively; entries that are not in the campaign are ignored. "
+            "Emails are deleted in batches, each committed on its own."
+        ),
+    )
+    def post(self, request):
+        campaign_id = request.query_params.get("campaign_id")
+        file = request.FILES.get("file")
+
+        if not campaign_id:
+            return Response({"error": "Campaign ID is required."}, status=400)
+
+        try:
+            campaign_id = int(campaign_id)
+        except ValueError:
+            return Response({"error": "Campaign ID must be an integer."}, status=400)
+
+        if not Campaign.objects.filter(campaign_id=campaign_id).exists():
+            return Response({"error": "Campaign not found."}, status=404)
+
+        if file is not None:
+            if not file.name.lower().endswith(UPLOAD_EXTENSIONS):
+                return Response(
+                    {"error": "Unsupported file format. Please upload an Excel or CSV file."},
+                    status=400,
+                )
+            try:
+                email_addresses, email_ids = split_recipient_list(iter_recipient_list(file))
+            except (InvalidFileException, zipfile.BadZipFile):
+                return Response(
+                    {"error": "Invalid Excel file. Please upload a valid file."}, status=400
+                )
+            except ValueError as e:
+                return Response({"error": str(e)}, status=400)
+        else:
+            email_addresses = request.data.get("email_addresses") or []
+            email_ids = request.data.get("email_ids") or []
+            if not isinstance(email_addresses, list) or not all(
+                isinstance(address, str) for address in email_addresses
+            ):
+                return Response(
+                    {"error": "email_addresses must be a list of strings."}, status=400
+                )
+            if not isinstance(email_ids, list) or not all(
+                isinstance(email_id, int) and not isinstance(email_id, bool)
+                for email_id in email_ids
+            ):
+                return Response({"error": "email_ids must be a list of integers."}, status=400)
+
+        if not email_addresses and not email_ids:
+            return Response({"error": "Email addresses or IDs are required."}, status=400)
+
+        try:
+            batches = delete_recipients(campaign_id, email_addresses, email_ids)
+        except Exception as e:
+            return Response({"error": str(e)}, status=500)
+
+        return Response(
+            {
+                "campaign_id": campaign_id,
+                "requested": sum(batch["requested"] for batch in batches),
+                "deleted": sum(batch["deleted"] for batch in batches),
+                "batches": batches,
+            },
+            status=200,
+        )
+
+
 class UpdateEmailView(APIView):
     @extend_schema(
         parameters=[
@@ -919,7 +1646,11 @@ class UpdateEmailView(APIView):
             return Response({"error": "Email address is required."}, status=400)
 
         try:
-            email = Email.objects.get(campaign_id=campaign_id, email_id=email_id)
+            email = Email.objects.get(
+                campaign_id=campaign_id,
+                campaign_id__deleted_at__isnull=True,
+                email_id=email_id,
+            )
         except Email.DoesNotExist:
             return Response(
                 {